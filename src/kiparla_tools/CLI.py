@@ -1,27 +1,31 @@
 """Command Line Interface for the toolkit"""
+import time
+_IMPORT_START = time.perf_counter()
+
 import argparse
+import concurrent.futures
+import importlib
+import multiprocessing
+import sys
 import tqdm
 import pathlib
 import collections
 import logging
-import json
-
 
-import spacy_udpipe
-import spacy_conll
 import yaml
-from wtpsplit import SaT
 
 from kiparla_tools import args_check as ac
 from kiparla_tools import serialize
+from kiparla_tools import data
 from kiparla_tools import alignment
 from kiparla_tools import main as main_tools
 from kiparla_tools import linguistic_pipeline as pipeline
 from kiparla_tools import logging_utils as logging_utils
 from kiparla_tools import alignment
 
-logger = logging.getLogger(__name__)
-logging_utils.setup_logging(logger)
+# named explicitly, since __name__ is "__main__" when run with python -m
+logger = logging.getLogger("kiparla_tools.CLI")
+_IMPORT_TIME = time.perf_counter() - _IMPORT_START
 
 
 def _eaf2csv(args):
@@ -90,45 +94,170 @@ def _process(args):
 	else:
 		input_files = list(args.input_files)
 
-	annotations = collections.defaultdict(dict)
+	annotations_fnames = {}
 	if args.units_annotations_dir:
 		for file in input_files:
 			supposed_annotation_path = pathlib.Path(args.units_annotations_dir).joinpath(f"{file.stem}.yml")
 			if supposed_annotation_path.is_file():
-				content = serialize.load_annotations(supposed_annotation_path)
-				annotations[file.stem] = content
+				annotations_fnames[file.stem] = supposed_annotation_path
 
 	output_json = args.output_dir.joinpath("summary.json")
-	full_data = []
-	transcripts = {}
-	pbar = tqdm.tqdm(input_files)
-	for filename in pbar:
-		transcript_name = filename.stem
-		pbar.set_description(f"Processing {transcript_name}")
-		logger.debug("Processing %s", transcript_name)
+	manifest_fname = args.output_dir.joinpath(serialize.MANIFEST_FNAME)
+
+	fingerprints = {filename.stem: main_tools.input_fingerprint(filename, annotations_fnames.get(filename.stem),
+																args.duration_threshold)
+					for filename in input_files}
+
+	# transcripts whose inputs did not change since the previous run keep their outputs and summary,
+	# statistics need the transcripts as well, which are then restored from their saved copy
+	def _up_to_date(transcript_name):
+		cache_fname = args.output_dir.joinpath(f"{transcript_name}{serialize.TRANSCRIPT_CACHE_SUFFIX}")
+		return args.output_dir.joinpath(f"{transcript_name}.vert.tsv").is_file() \
+			and args.output_dir.joinpath(f"{transcript_name}.csv").is_file() \
+			and (not (args.save_transcripts or args.produce_stats)
+				or serialize.transcript_cache_is_current(cache_fname, fingerprints[transcript_name]))
+
+	reused = {}
+	if not args.force and output_json.is_file():
+		previous = serialize.load_manifest(manifest_fname)
+		unchanged = {transcript_name for transcript_name, fingerprint in fingerprints.items()
+					if previous.get(transcript_name) == fingerprint and _up_to_date(transcript_name)}
+
+		if len(unchanged) > 0:
+			try:
+				reused = {summary["transcript"]: summary for summary in serialize.read_summaries(output_json)
+							if summary.get("transcript") in unchanged}
+			except ValueError:
+				logger.warning("Ignoring unreadable summary %s", output_json)
+				reused = {}
+		logger.info("%d transcript(s) unchanged since the previous run", len(reused))
 
-		transcript = main_tools.process_transcript(filename, annotations[transcript_name],
-												duration_threshold=args.duration_threshold,
-												tiers_to_ignore=["Traduzione"])
-		transcripts[transcript_name] = transcript
-		logger.info("Successfully processed %s", transcript_name)
+	annotations = collections.defaultdict(dict)
+	for transcript_name, annotation_path in annotations_fnames.items():
+		if transcript_name not in reused:
+			annotations[transcript_name] = serialize.load_annotations(annotation_path)
+
+	# statistics are collected as soon as each transcript is ready, in the order of the input files
+	corpus_statistics = serialize.CorpusStatistics(capacity=max(len(input_files), 1)) if args.produce_stats else None
+	built = {}
+
+	# summaries and statistics follow the order of the input files,
+	# transcripts that cannot be processed are reported and skipped
+	failed = []
+	with serialize.SummaryWriter(output_json) as summary_writer:
+		if args.jobs == 1:
+			pbar = tqdm.tqdm(input_files)
+			for file_id, filename in enumerate(pbar):
+				transcript_name = filename.stem
+				if transcript_name in reused:
+					summary_writer.write(reused[transcript_name])
+					built[transcript_name] = fingerprints[transcript_name]
+					if args.produce_stats:
+						corpus_statistics.add_transcript(serialize.load_transcript(
+							args.output_dir.joinpath(f"{transcript_name}{serialize.TRANSCRIPT_CACHE_SUFFIX}"),
+							fingerprints[transcript_name]), position=file_id)
+					continue
+
+				pbar.set_description(f"Processing {transcript_name}")
+				logger.debug("Processing %s", transcript_name)
+
+				try:
+					summary, stats = main_tools.process_and_write(filename, annotations[transcript_name],
+																	args.output_dir,
+																	duration_threshold=args.duration_threshold,
+																	save_transcript=args.save_transcripts,
+																	return_stats=args.produce_stats,
+																	fingerprint=fingerprints[transcript_name])
+				except Exception:
+					logger.exception("Error while processing %s", transcript_name)
+					failed.append(transcript_name)
+					continue
+				summary_writer.write(summary)
+				if stats is not None:
+					corpus_statistics.append(stats, position=file_id)
+				built[transcript_name] = fingerprints[transcript_name]
+
+			logger.info("Token analysis cache: %s", data.analyse_token.cache_info())
 
-		output_filename_vert = args.output_dir.joinpath(f"{transcript_name}.vert.tsv")
-		output_filename_tus = args.output_dir.joinpath(f"{transcript_name}.csv")
-		logger.debug("Writing CoNLL output to %s", output_filename_vert)
-		logger.debug("Writing TUs output to %s", output_filename_tus)
+		else:
+			for file_id, filename in enumerate(input_files):
+				if filename.stem in reused:
+					summary_writer.write(reused[filename.stem], position=file_id)
+					built[filename.stem] = fingerprints[filename.stem]
+					if args.produce_stats:
+						corpus_statistics.add_transcript(serialize.load_transcript(
+							args.output_dir.joinpath(f"{filename.stem}{serialize.TRANSCRIPT_CACHE_SUFFIX}"),
+							fingerprints[filename.stem]), position=file_id)
+
+			# workers write their own outputs and log through the queue of this process,
+			# summaries (and statistics, only when needed) are sent back
+			with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs,
+														initializer=logging_utils.setup_worker_logging,
+														initargs=(logging_utils.setup_logging(),
+																logging.getLogger(logging_utils.PACKAGE_LOGGER).level)) as executor:
+				futures = {executor.submit(main_tools.process_and_write, filename, annotations[filename.stem],
+											args.output_dir,
+											duration_threshold=args.duration_threshold,
+											save_transcript=args.save_transcripts,
+											return_stats=args.produce_stats,
+											fingerprint=fingerprints[filename.stem]): file_id
+							for file_id, filename in enumerate(input_files)
+							if filename.stem not in reused}
+
+				pbar = tqdm.tqdm(concurrent.futures.as_completed(futures), total=len(futures))
+				for future in pbar:
+					transcript_name = input_files[futures[future]].stem
+					pbar.set_description(f"Processed {transcript_name}")
+					summary = None
+					try:
+						summary, stats = future.result()
+						built[transcript_name] = fingerprints[transcript_name]
+						if stats is not None:
+							corpus_statistics.append(stats, position=futures[future])
+					except Exception:
+						logger.exception("Error while processing %s", transcript_name)
+						failed.append(transcript_name)
+					# summaries are written as soon as all the previous input files are done
+					summary_writer.write(summary, position=futures[future])
+
+	if len(failed) > 0:
+		logger.error("%d transcript(s) could not be processed: %s", len(failed), ", ".join(failed))
+
+	# only transcripts with up-to-date outputs are recorded, failed ones are processed again next time,
+	# in the order of the input files (parallel runs complete in any order)
+	serialize.dump_manifest({filename.stem: built[filename.stem] for filename in input_files if filename.stem in built},
+							manifest_fname)
 
+	if args.produce_stats:
+		corpus_statistics.write_tsv(args.output_dir.joinpath("stats.csv"))
+		if args.stats_parquet:
+			try:
+				corpus_statistics.write_parquet(args.output_dir.joinpath("stats.parquet"))
+			except ImportError as e:
+				logger.error("Statistics not written in Parquet format: %s", e)
 
-		full_data.append(serialize.build_json(transcript))
-		serialize.conversation_to_conll(transcript, output_filename_vert)
-		serialize.conversation_to_linear(transcript, output_filename_tus)
 
-	with open(output_json, 'w', encoding="utf-8") as json_file:
-		print(json.dumps(full_data, indent=2, ensure_ascii=False), file=json_file)
-		# logger.info("Successfully wrote %s", output_json)
+def _timeseries(args):
+	input_files = []
+	if args.input_dir:
+		input_files = list(args.input_dir.glob(f"*{serialize.TRANSCRIPT_CACHE_SUFFIX}"))
+	else:
+		input_files = args.input_files
 
-	if args.produce_stats:
-		serialize.print_full_statistics(transcripts, args.output_dir.joinpath("stats.csv"))
+	transcripts = {}
+	pbar = tqdm.tqdm(input_files)
+	for filename in pbar:
+		transcript_name = filename.name[:-len(serialize.TRANSCRIPT_CACHE_SUFFIX)]
+		pbar.set_description(f"Loading {transcript_name}")
+
+		transcript = serialize.load_transcript(filename)
+		if transcript is None:
+			logger.warning("Skipping %s, saved by a different version: process it again with --save-transcripts", filename)
+			continue
+		transcripts[transcript_name] = transcript
+
+	serialize.print_time_series(transcripts, args.output_dir.joinpath(f"time_series_{args.window_size:g}s.tsv"),
+								args.window_size, by_speaker=args.by_speaker, cumulative=args.cumulative)
 
 
 def _align(args):
@@ -163,9 +292,8 @@ def _align(args):
 	for filename in pbar:
 		pbar.set_description(f"Processing {filename.stem}")
 		transcript_name = filename.stem
-		transcript = serialize.transcript_from_csv(filename)
 
-		transcripts[transcript_name] = transcript
+		transcripts[transcript_name] = main_tools.load_or_process_transcript(filename, args.transcripts_dir)
 
 # impostare l'ordine trascrittore (01) / whi (02) - gold (03)
 # 1. creare le coppie di file allineati in base alla tipologia di file
@@ -256,6 +384,8 @@ def _segment(args):
 	else:
 		input_files = args.input_files
 
+	from wtpsplit import SaT
+
 	sat_sm = SaT("sat-12l-sm")
 
 	pbar = tqdm.tqdm(input_files)
@@ -274,6 +404,9 @@ def _parse(args):
 	else:
 		input_files = args.input_files
 
+	import spacy_udpipe
+	import spacy_conll # registers the conll_formatter pipe
+
 	nlp = spacy_udpipe.load_from_path(lang="it",
 								   path=args.udpipe_model,
 								   meta={"description": "Custom 'it' model"})
@@ -304,11 +437,32 @@ def _conll2conllu(args):
 		serialize.conll2conllu(filename, output_fname)
 
 
+def _import_profile(args):
+	"""
+	The function `_import_profile` reports the cold-start cost of an action: the time spent importing
+	the command line interface (and the modules of the toolkit) and then each of the third-party
+	modules that the action loads when it runs. Modules already imported count as zero.
+
+	:param args: parsed arguments, `args.imports` lists the modules needed by the action
+	"""
+	timings = [("kiparla_tools.CLI", _IMPORT_TIME)]
+	for module_name in args.imports:
+		start = time.perf_counter()
+		importlib.import_module(module_name)
+		timings.append((module_name, time.perf_counter() - start))
+
+	for module_name, seconds in timings:
+		print(f"{module_name}\t{seconds*1000:.1f} ms", file=sys.stderr)
+	print(f"total ({args.actions})\t{sum(x for _, x in timings)*1000:.1f} ms", file=sys.stderr)
+
+
 def main():
 
 	### MAIN ###
 	parent_parser = argparse.ArgumentParser(add_help=False)
 	root_parser = argparse.ArgumentParser(prog='kiparla-tools', add_help=True)
+	root_parser.add_argument("--import-profile", action="store_true",
+							help="print the time needed to import the dependencies of the action and exit")
 	subparsers = root_parser.add_subparsers(title="actions", dest="actions")
 
 	# EAF2CSV
@@ -328,7 +482,7 @@ def main():
 								help="path to input directory. All .eaf files will be transformed")
 	parser_eaf2csv.add_argument("--units-annotations-dir", type=ac.valid_dirpath,
 								help="") #TODO: write help
-	parser_eaf2csv.set_defaults(func=_eaf2csv)
+	parser_eaf2csv.set_defaults(func=_eaf2csv, imports=[])
 
 	# CSV2EAF
 	parser_csv2eaf = subparsers.add_parser("csv2eaf", parents=[parent_parser],
@@ -354,7 +508,7 @@ def main():
 								help="") #TODO: ADD HELP
 	parser_csv2eaf.add_argument("--include-ids", action="store_true",
 								help="") #TODO write help
-	parser_csv2eaf.set_defaults(func=_csv2eaf)
+	parser_csv2eaf.set_defaults(func=_csv2eaf, imports=["pympi.Elan"])
 
 	# PROCESS
 	parser_process = subparsers.add_parser("process", parents=[parent_parser],
@@ -375,9 +529,41 @@ def main():
 								help="") # TODO: write help
 	parser_process.add_argument("-s", "--produce-stats", action="store_true",
 								help="") # TODO: write help
+	parser_process.add_argument("--stats-parquet", action="store_true",
+								help="with -s, also write statistics in Parquet format (stats.parquet, requires pyarrow)")
 	parser_process.add_argument("--units-annotations-dir", type=ac.valid_dirpath,
 								help="") #TODO: write help
-	parser_process.set_defaults(func=_process)
+	parser_process.add_argument("-j", "--jobs", type=ac.valid_jobs, default=1,
+								help="number of transcripts processed in parallel (0 uses all available CPUs)")
+	parser_process.add_argument("--save-transcripts", action="store_true",
+								help=f"save each processed transcript (*{serialize.TRANSCRIPT_CACHE_SUFFIX}) in the output directory, "
+								"so that it can be loaded without processing it again")
+	parser_process.add_argument("--force", action="store_true",
+								help="process all transcripts, even those unchanged since the previous run (see manifest.json in the output directory)")
+	parser_process.set_defaults(func=_process, imports=["networkx", "num2words", "pandas"])
+
+	# TIMESERIES
+	parser_timeseries = subparsers.add_parser("timeseries", parents=[parent_parser],
+											description='compute statistics over time windows of transcripts saved by process --save-transcripts',
+											help='compute statistics over time windows')
+	parser_timeseries.add_argument("-o", "--output-dir", default="output/",
+								type=ac.valid_dirpath,
+								help="path to output directory")
+	group = parser_timeseries.add_argument_group('Input files')
+	command_group = group.add_mutually_exclusive_group(required=True)
+	command_group.add_argument("--input-files", nargs="+",
+								type=ac.valid_filepath,
+								help=f"path(s) to saved transcript(s) (*{serialize.TRANSCRIPT_CACHE_SUFFIX})")
+	command_group.add_argument("--input-dir",
+								type=ac.valid_dirpath,
+								help=f"path to input directory. All *{serialize.TRANSCRIPT_CACHE_SUFFIX} files will be read")
+	parser_timeseries.add_argument("-w", "--window-size", type=ac.valid_duration, default=60,
+								help="duration of windows, in seconds")
+	parser_timeseries.add_argument("--by-speaker", action="store_true",
+								help="compute statistics separately for each speaker")
+	parser_timeseries.add_argument("--cumulative", action="store_true",
+								help="include all the previous units in each window")
+	parser_timeseries.set_defaults(func=_timeseries, imports=[])
 
 	# ALIGN
 	parser_align = subparsers.add_parser("align", parents=[parent_parser],
@@ -394,7 +580,11 @@ def main():
 	command_group.add_argument("--input-dir",
 								type=ac.valid_dirpath,
 								help="path to input directory. All .conllu files will be transformed")
-	parser_align.set_defaults(func=_align)
+	parser_align.add_argument("--transcripts-dir",
+								type=ac.valid_dirpath,
+								help="path to directory containing transcripts saved by process --save-transcripts, "
+								"loaded instead of processing the csv files when they were saved from the same files")
+	parser_align.set_defaults(func=_align, imports=["networkx"])
 
 	# CICLE
 	parser_cicle = subparsers.add_parser("cicle", parents=[parent_parser],
@@ -409,7 +599,7 @@ def main():
 	parser_cicle.add_argument("-o", "--output-dir",
 							type=ac.valid_dirpath,
 							help="path to directory containing csv and conllu files")
-	parser_cicle.set_defaults(func=_cicle)
+	parser_cicle.set_defaults(func=_cicle, imports=["networkx", "num2words", "pympi.Elan"])
 
 	# SPLIT
 	parser_split = subparsers.add_parser("segment", parents=[parent_parser],
@@ -428,7 +618,7 @@ def main():
 							help="path to directory containing csv and conll files")
 	parser_split.add_argument("--remove-metalinguistic", action="store_true",
 								help="") #TODO write help
-	parser_split.set_defaults(func=_segment)
+	parser_split.set_defaults(func=_segment, imports=["wtpsplit"])
 
 	# PARSE
 	parser_parse = subparsers.add_parser("parse", parents=[parent_parser],
@@ -449,7 +639,7 @@ def main():
 								help="") #TODO write help
 	parser_parse.add_argument("--udpipe-model", #type=ac.valid_filepath,
 							help="") #TODO write help
-	parser_parse.set_defaults(func=_parse)
+	parser_parse.set_defaults(func=_parse, imports=["spacy_udpipe", "spacy_conll"])
 
 	# CONLL2CONLLU
 	parser_conll2conllu = subparsers.add_parser("conll2conllu", parents=[parent_parser],
@@ -466,7 +656,7 @@ def main():
 	parser_conll2conllu.add_argument("-o", "--output-dir",
 							type=ac.valid_dirpath,
 							help="path to directory containing csv and conllu files")
-	parser_conll2conllu.set_defaults(func=_conll2conllu)
+	parser_conll2conllu.set_defaults(func=_conll2conllu, imports=[])
 
 
 	args = root_parser.parse_args()
@@ -475,6 +665,15 @@ def main():
 		root_parser.print_usage()
 		exit()
 
+	if args.import_profile:
+		_import_profile(args)
+		return
+
+	# a queue shared with worker processes is only needed when running in parallel
+	if getattr(args, "jobs", 1) > 1:
+		logging_utils.setup_logging(multiprocessing.Queue())
+	else:
+		logging_utils.setup_logging()
 	args.func(args)
 
 if __name__ == "__main__":
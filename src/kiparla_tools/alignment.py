@@ -29,13 +29,16 @@ def align_transcripts(transcript_a:List[data.Token], transcript_b:List[data.Toke
 	tokens_a = []
 	tokens_b = []
 
+	# the time index selects the units ending before min_length, tokens keep the order in which units were read
+	units_a = {tu.tu_id for tu in transcript_a.units_before(min_length)}
 	for tu_id, tu in transcript_a.transcription_units_dict.items():
-		if tu.end <= min_length:
+		if tu_id in units_a:
 			for token_id, token in tu.tokens.items():
 				tokens_a.append(token)
 
+	units_b = {tu.tu_id for tu in transcript_b.units_before(min_length)}
 	for tu_id, tu in transcript_b.transcription_units_dict.items():
-		if tu.end <= min_length:
+		if tu_id in units_b:
 			for token_id, token in tu.tokens.items():
 				tokens_b.append(token)
 
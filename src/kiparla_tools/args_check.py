@@ -1,4 +1,5 @@
 """Set of validators for command line argument values"""
+import os
 import pathlib
 import argparse
 
@@ -13,3 +14,25 @@ def valid_dirpath(path):
     if not pathlib.Path(path).is_dir():
         raise argparse.ArgumentTypeError(f"'{path}' is not a valid directory.")
     return pathlib.Path(path)
+
+
+def valid_jobs(value):
+    """Custom validation function for the number of parallel jobs: 0 means all available CPUs."""
+    try:
+        jobs = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a valid number of jobs.")
+    if jobs < 0:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a valid number of jobs.")
+    return jobs or os.cpu_count() or 1
+
+
+def valid_duration(value):
+    """Custom validation function to check if the value is a positive duration, in seconds."""
+    try:
+        duration = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a valid duration.")
+    if not duration > 0:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a valid duration.")
+    return duration
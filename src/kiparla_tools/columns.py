@@ -0,0 +1,110 @@
+"""Columnar (struct-of-arrays) view of the tokens of a transcript"""
+from dataclasses import dataclass, field
+from typing import List
+
+import numpy as np
+
+import kiparla_tools.dataflags as df
+
+# bits of TokenColumns.flags
+TRUNCATION = 1
+INTERRUPTION = 2
+PROSODICLINK = 4
+SPACEAFTER = 8
+NON_ITA = 16
+NON_ORTHO = 32
+PROLONGED = 64
+SLOW_PACE = 128
+FAST_PACE = 256
+OVERLAPPING = 512
+
+
+@dataclass
+class TokenColumns:
+	token_type: np.ndarray
+	intonation: np.ndarray
+	volume: np.ndarray
+	flags: np.ndarray
+	tu_index: np.ndarray
+	speaker: np.ndarray
+	form: np.ndarray
+	tu_start: np.ndarray
+	tu_end: np.ndarray
+	tu_speaker: np.ndarray
+	speakers: List[str] = field(default_factory=lambda: [])
+	forms: List[str] = field(default_factory=lambda: [])
+
+	@classmethod
+	def from_transcript(cls, transcript):
+		"""
+		Builds the columns with a single pass over the tokens of `transcript`.
+		Token types, intonation patterns and volumes are stored as the values of their flags
+		(0 for a missing volume), forms as indices into the `forms` table.
+		"""
+
+		speaker_codes = {}
+		form_codes = {}
+
+		token_type, intonation, volume, flags = [], [], [], []
+		tu_index, speaker, form = [], [], []
+		tu_start, tu_end, tu_speaker = [], [], []
+
+		for position, tu in enumerate(transcript.transcription_units):
+			speaker_code = speaker_codes.setdefault(tu.speaker, len(speaker_codes))
+			tu_start.append(tu.start)
+			tu_end.append(tu.end)
+			tu_speaker.append(speaker_code)
+
+			for tok in tu.tokens.values():
+				token_type.append(tok.token_type.value)
+				intonation.append(tok.intonation_pattern.value)
+				volume.append(tok.volume.value if tok.volume else 0)
+				flags.append((TRUNCATION if tok.truncation else 0) |
+							(INTERRUPTION if tok.interruption else 0) |
+							(PROSODICLINK if tok.prosodiclink else 0) |
+							(SPACEAFTER if tok.spaceafter else 0) |
+							(NON_ITA if tok.non_ita else 0) |
+							(NON_ORTHO if tok.non_ortho else 0) |
+							(PROLONGED if tok.prolongations else 0) |
+							(SLOW_PACE if tok.slow_pace else 0) |
+							(FAST_PACE if tok.fast_pace else 0) |
+							(OVERLAPPING if tok.overlaps else 0))
+				tu_index.append(position)
+				speaker.append(speaker_code)
+				form.append(form_codes.setdefault(tok.text, len(form_codes)))
+
+		return cls(np.array(token_type, dtype=np.uint8),
+					np.array(intonation, dtype=np.uint8),
+					np.array(volume, dtype=np.uint8),
+					np.array(flags, dtype=np.uint16),
+					np.array(tu_index, dtype=np.int32),
+					np.array(speaker, dtype=np.int16),
+					np.array(form, dtype=np.int32),
+					np.array(tu_start, dtype=np.float64),
+					np.array(tu_end, dtype=np.float64),
+					np.array(tu_speaker, dtype=np.int16),
+					list(speaker_codes),
+					list(form_codes))
+
+	def __len__(self):
+		return len(self.token_type)
+
+	def has_type(self, token_type: df.tokentype):
+		return (self.token_type & token_type.value) != 0
+
+	def has_intonation(self, intonation: df.intonation):
+		return (self.intonation & intonation.value) != 0
+
+	def has_volume(self, volume: df.volume):
+		return (self.volume & volume.value) != 0
+
+	def has_flag(self, flag):
+		return (self.flags & flag) != 0
+
+	def count_per_tu(self, mask):
+		"""Number of tokens selected by `mask` in each transcription unit, in transcript order"""
+		return np.bincount(self.tu_index[mask], minlength=len(self.tu_start))
+
+	def count_per_speaker(self, mask):
+		"""Number of tokens selected by `mask` for each speaker, in the order of `speakers`"""
+		return np.bincount(self.speaker[mask], minlength=len(self.speakers))
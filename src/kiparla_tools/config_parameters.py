@@ -4,6 +4,13 @@ CONLL_FIELDNAMES = ["token_id", "speaker", "tu_id", "unit", "id", "span",
 					"align", "prolongations", "pace",
 					"guesses", "overlaps"]
 
+LINEAR_FIELDNAMES = ["tu_id", "speaker", "start", "end", "duration", "include", "variation",
+					"W:normalized_spaces", "W:numbers", "W:accents", "W:non_jefferson", "W:pauses_trim", "W:prosodic_trim", "W:moved_boundaries", "W:switches", "W:overlap_mismatch",
+					"E:volume", "E:pace", "E:guess", "E:overlap", "E:overlap_mismatch", "E:overlap_annotation", "E:overlap_time",
+					"E:overlap_duration",
+					"T:shortpauses", "T:nonverbalbehavior", "T:errors", "T:linguistic",
+					"original", "text", "orthographic"]
+
 MULTIWORDS = {
 	"abbattersi": 2,
 "abbatterti": 2,
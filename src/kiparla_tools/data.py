@@ -1,22 +1,223 @@
 import collections
+import collections.abc
+import bisect
 import functools
-import csv # for annotators' statistics
-from dataclasses import dataclass, field
+import hashlib
+import heapq
+from dataclasses import dataclass, field, fields
 from typing import List, Dict, Tuple
 import logging
 
 import regex as re
-import pandas as pd
-import networkx as nx
+import numpy as np
 
 import kiparla_tools.process_text as pt
 import kiparla_tools.dataflags as df
 import kiparla_tools.utils as utils
-from kiparla_tools.logging_utils import setup_logging
+import kiparla_tools.overlaps as ov
+import kiparla_tools.columns as cols
+import kiparla_tools.summary as summ
 
 logger = logging.getLogger(__name__)
-setup_logging(logger)
 
+TOKEN_CACHE_SIZE = 2**16
+
+class _EmptyFeatures(collections.abc.Mapping):
+    """Shared, read-only placeholder for the feature maps of tokens, most of which stay empty"""
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(())
+
+    def __len__(self):
+        return 0
+
+    def __setitem__(self, key, value):
+        raise TypeError("feature maps of tokens are allocated on first write, use Token.set_feature")
+
+    def __repr__(self):
+        return "{}"
+
+    def __reduce__(self):
+        # unpickled (and copied) tokens keep pointing to the shared placeholder
+        return "EMPTY_FEATURES"
+
+
+EMPTY_FEATURES = _EmptyFeatures()
+
+
+@dataclass(frozen=True)
+class TokenAnalysis:
+    text: str
+    token_type: df.tokentype = df.tokentype.linguistic
+    intonation_pattern: df.intonation = df.intonation.plain
+    volume: df.volume = None
+    interruption: bool = False
+    truncation: bool = False
+    non_ita: bool = False
+    iso_code: str = "ita"
+    non_ortho: bool = False
+    prolongations: Tuple[Tuple[int, int], ...] = ()
+
+
+_REMOVED_CHARS = str.maketrans("", "", "[]()<>°")
+_LEADING_SYMBOLS = "'~-"
+_TRAILING_SYMBOLS = "-'~"
+_FINAL_SYMBOLS = ".,?"
+_INTONATIONS = {".": df.intonation.falling,
+                ",": df.intonation.weakly_rising,
+                "?": df.intonation.rising}
+
+
+def _scan_word(text):
+    """
+    Single left-to-right scan of a word with shape ['~-]?L[L:]*[-'~]?[.,?]?, where L is any letter
+
+    :return: None if the text does not have the expected shape, otherwise a tuple with the leading symbol,
+    the letters, the prolongations (position of the prolonged character: number of colons),
+    the trailing symbol and the final punctuation
+    """
+    leading = trailing = final = ""
+    letters = []
+    prolongations = {}
+
+    # 0: beginning, 1: after leading symbol, 2: inside word, 3: after trailing symbol, 4: after final punctuation
+    state = 0
+    for char in text:
+        if state == 2:
+            if char == ":":
+                position = len(leading) + len(letters) - 1
+                prolongations[position] = prolongations.get(position, 0) + 1
+            elif char.isalpha():
+                letters.append(char)
+            elif char in _TRAILING_SYMBOLS:
+                trailing = char
+                state = 3
+            elif char in _FINAL_SYMBOLS:
+                final = char
+                state = 4
+            else:
+                return None
+        elif state < 2:
+            if char.isalpha():
+                letters.append(char)
+                state = 2
+            elif state == 0 and char in _LEADING_SYMBOLS:
+                leading = char
+                state = 1
+            else:
+                return None
+        elif state == 3 and char in _FINAL_SYMBOLS:
+            final = char
+            state = 4
+        else:
+            return None
+
+    if state < 2:
+        return None
+
+    return leading, "".join(letters), prolongations, trailing, final
+
+
+@functools.lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def analyse_token(text):
+    """
+    The function `analyse_token` derives from the text of a token its orthographic form and the
+    features that only depend on the text (type, intonation, truncation, interruption, prolongations,
+    volume, language and orthography). Results are cached, as the same forms occur over and over in
+    a corpus: hits and misses can be inspected with `analyse_token.cache_info()`.
+
+    :param text: text of the token, as found in the transcription unit
+    :return: a `TokenAnalysis` record
+    """
+
+    token_type = df.tokentype.linguistic
+    intonation_pattern = df.intonation.plain
+    volume = None
+    interruption = False
+    truncation = False
+    non_ita = False
+    iso_code = "ita"
+    non_ortho = False
+    prolongations = {}
+
+    def analysis():
+        return TokenAnalysis(text, token_type, intonation_pattern, volume,
+                            interruption, truncation, non_ita, iso_code, non_ortho,
+                            tuple(prolongations.items()))
+
+    if len(text.strip()) == 0:
+        return analysis()
+
+    text = text.translate(_REMOVED_CHARS)
+
+    if all(c == "x" for c in text):
+        token_type = df.tokentype.unknown
+        text = "x"
+        return analysis()
+
+    if text[0] == "$":
+        logger.debug("Not existing in italian detected in token %s", text)
+        non_ortho = True
+        text = text[1:]
+
+    if text[0] == "#":
+        logger.debug("Different language detected in token %s", text)
+        non_ita = True
+        iso_code = "NO_ISO_CODE"
+        text = text[1:]
+
+    if text.startswith("@"):
+        token_type = df.tokentype.anonymized
+        return analysis()
+
+    # po' is the only form allowed to have prolongations before the apostrophe
+    if text.startswith("po'"):
+        rest = text[3:]
+        final = rest[-1] if rest and rest[-1] in _FINAL_SYMBOLS else ""
+        colons = rest[:len(rest)-len(final)]
+        if colons.count(":") == len(colons):
+            if final:
+                intonation_pattern = _INTONATIONS[final]
+            if colons:
+                prolongations[1] = len(colons)
+            text = "po'"
+            return analysis()
+
+    scanned = _scan_word(text)
+
+    if scanned is None:
+        if text == "{P}":
+            token_type = df.tokentype.shortpause
+        elif text.startswith("{"):
+            token_type = df.tokentype.nonverbalbehavior
+        else:
+            token_type = df.tokentype.error
+        return analysis()
+
+    leading, letters, prolongations, trailing, final = scanned
+
+    # ! find prosodic features: intonation, truncation and interruptions
+    if final:
+        intonation_pattern = _INTONATIONS[final]
+    elif trailing in ["-", "~"] or leading in ["-", "~"]:
+        interruption = True
+    elif trailing == "'" or leading == "'":
+        if letters != "po":
+            truncation = True
+
+    # check for high volume
+    if any(letter.isupper() for letter in letters):
+        volume = df.volume.high
+    text = (leading + letters + trailing).lower()
+
+    return analysis()
+
+
+@utils.add_slots
 @dataclass
 class Token:
     text: str
@@ -28,11 +229,11 @@ class Token:
     intonation_pattern: df.intonation = df.intonation.plain
     position_in_tu: df.position = df.position.inner
     volume: df.volume = None
-    overlaps: Dict[int, Tuple[int, int]] = field(default_factory=lambda: {})
-    slow_pace: Dict[int, Tuple[int, int]] = field(default_factory=lambda: {})
-    guesses: Dict[int, Tuple[int, int]] = field(default_factory=lambda: {})
-    fast_pace: Dict[int, Tuple[int, int]] = field(default_factory=lambda: {})
-    low_volume: Dict[int, Tuple[int, int]] = field(default_factory=lambda: {})
+    overlaps: Dict[int, Tuple[int, int]] = field(default_factory=lambda: EMPTY_FEATURES)
+    slow_pace: Dict[int, Tuple[int, int]] = field(default_factory=lambda: EMPTY_FEATURES)
+    guesses: Dict[int, Tuple[int, int]] = field(default_factory=lambda: EMPTY_FEATURES)
+    fast_pace: Dict[int, Tuple[int, int]] = field(default_factory=lambda: EMPTY_FEATURES)
+    low_volume: Dict[int, Tuple[int, int]] = field(default_factory=lambda: EMPTY_FEATURES)
     interruption: bool = False
     truncation: bool = False
     prosodiclink: bool = False
@@ -40,116 +241,26 @@ class Token:
     non_ita: bool = False
     iso_code: str = "ita"
     non_ortho: bool = False
-    prolongations: Dict[int, int] = field(default_factory=lambda: {})
-    warnings: Dict[str, int] = field(default_factory=lambda: collections.defaultdict(int))
-    errors: List[str] = field(default_factory=lambda: collections.defaultdict(int))
+    prolongations: Dict[int, int] = field(default_factory=lambda: EMPTY_FEATURES)
+    warnings: Dict[str, int] = field(default_factory=lambda: EMPTY_FEATURES)
+    errors: List[str] = field(default_factory=lambda: EMPTY_FEATURES)
 
     def __post_init__(self):
 
         self.orig_text = self.text
 
-        if len(self.text.strip()) == 0:
-            return
-
-        chars = ["[","]", "(", ")", "<", ">", "°"]
-
-        for char in chars:
-            self.text = self.text.replace(char, "")
-
-        if all(c == "x" for c in self.text):
-            self.token_type = df.tokentype.unknown
-            self.text = "x"
-            return
-
-        if self.text[0] == "$":
-            logger.debug("Not existing in italian detected in token %s", self.text)
-            self.non_ortho = True
-            self.text = self.text[1:]
-
-        if self.text[0] == "#":
-            logger.debug("Different language detected in token %s", self.text)
-            self.non_ita = True
-            self.iso_code = "NO_ISO_CODE"
-            self.text = self.text[1:]
-
-
-        # ! STEP 1: check that token has shape '?([a-z]+:*)+[-']?[.,?]
-        matching_po = re.fullmatch(r"po':*[.,?]?", self.text)
-        matching_anonymized = self.text.startswith("@")
-        matching_instance = re.fullmatch(r"['~-]?(\p{L}+:*)*\p{L}+:*[-'~]?[.,?]?", self.text)
-
-        if matching_anonymized:
-            self.token_type = df.tokentype.anonymized
-            return
-
-        if matching_instance is None:
-            if self.text == "{P}":
-                self.token_type = df.tokentype.shortpause
-                return
-            elif self.text.startswith("{"):
-                self.token_type = df.tokentype.nonverbalbehavior
-                return
-            elif matching_po is None:
-                self.token_type = df.tokentype.error
-                return
-
-        if matching_po:
-            self.text, _ = re.subn(r"'(:*)",
-                                    r"\1'",
-                                    self.text)
-
-        # ! STEP2: find final prosodic features: intonation, truncation and interruptions
-        if self.text.endswith("."):
-            self.intonation_pattern = df.intonation.falling
-            self.text = self.text[:-1] # this line removes the last character of the string (".")
-        elif self.text.endswith(","):
-            self.intonation_pattern = df.intonation.weakly_rising
-            self.text = self.text[:-1]
-        elif self.text.endswith("?"):
-            self.intonation_pattern = df.intonation.rising
-            self.text = self.text[:-1]
-        elif self.text.endswith("-") or self.text.endswith("~"):
-            self.interruption = True
-        elif self.text.startswith("-") or self.text.startswith("~"):
-            self.interruption = True
-        elif self.text.endswith("'") or self.text.startswith("'"):
-            alpha_text = [x for x in self.text if x.isalpha()]
-            if "".join(alpha_text) not in ["po"]:
-                self.truncation = True
-
-        # ! STEP3: at this point we should be left with the bare word with only prolongations
-        logger.debug("Token after step 2: %s", self.text)
-
-        tmp_text = []
-        i=0
-        for char in self.text:
-            if char in [":"]:
-                tmp_text.append((-2, char))
-            elif char in ["'", "-", "~"]:
-                tmp_text.append((-2, char))
-                i+=1
-            else:
-                tmp_text.append((i, char))
-                i+=1
-
-        matches = list(re.finditer(r":+", self.text))
-        for match in matches:
-            begin, end = match.span()
-            char_id = begin
-            while tmp_text[char_id][0]<0:
-                char_id -= 1
-            char_id = tmp_text[char_id][0]
-            span_len = end-begin
-            self.prolongations[char_id] = span_len
-
-        new_text, substitutions = re.subn(r":+", "", self.text)
-        if substitutions > 0:
-            self.text = new_text
-
-        # check for high volume
-        if any(letter.isupper() for letter in self.text):
-            self.volume = df.volume.high
-        self.text = self.text.lower()
+        analysis = analyse_token(self.text)
+        self.text = analysis.text
+        self.token_type = analysis.token_type
+        self.intonation_pattern = analysis.intonation_pattern
+        self.volume = analysis.volume
+        self.interruption = analysis.interruption
+        self.truncation = analysis.truncation
+        self.non_ita = analysis.non_ita
+        self.iso_code = analysis.iso_code
+        self.non_ortho = analysis.non_ortho
+        if analysis.prolongations:
+            self.prolongations = dict(analysis.prolongations)
 
     def add_span(self, start, end):
         self.span = (start, end)
@@ -160,30 +271,47 @@ class Token:
     def __str__(self):
         return self.text
 
+    def set_feature(self, field_name, key, value):
+        """
+        The function `set_feature` sets `key` to `value` in a feature map of the token
+        (`overlaps`, `slow_pace`, `guesses`, `fast_pace`, `low_volume`, `prolongations`, `warnings` or `errors`).
+        Feature maps of new tokens all point to the shared, read-only EMPTY_FEATURES and the token's own map is
+        only allocated on first write, so features must be set with this method (or `add_info`), not directly.
+
+        :param field_name: name of the feature map
+        :param key: key of the feature
+        :param value: value of the feature
+        """
+        features = getattr(self, field_name)
+        if features is EMPTY_FEATURES:
+            features = collections.defaultdict(int) if field_name in ("warnings", "errors") else {}
+            setattr(self, field_name, features)
+        features[key] = value
+
     def add_info(self, field_name, field_value):
         if field_name == "ProsodicLink":
             self.prosodiclink = True
 
         if field_name == "overlaps":
             match_id, id_from, id_to = field_value
-            self.overlaps[match_id] = (id_from, id_to)
+            self.set_feature("overlaps", match_id, (id_from, id_to))
 
         if field_name == "slow_pace":
             span_id, id_from, id_to = field_value
-            self.slow_pace[span_id] = (id_from, id_to)
+            self.set_feature("slow_pace", span_id, (id_from, id_to))
 
         if field_name == "fast_pace":
             span_id, id_from, id_to = field_value
-            self.fast_pace[span_id] = (id_from, id_to)
+            self.set_feature("fast_pace", span_id, (id_from, id_to))
 
         if field_name == "low_volume":
             span_id, id_from, id_to = field_value
-            self.low_volume[span_id] = (id_from, id_to)
+            self.set_feature("low_volume", span_id, (id_from, id_to))
             self.volume = df.volume.low
 
         if field_name == "guesses":
             span_id, id_from, id_to = field_value
-            self.guesses[span_id] = (id_from, id_to)
+            self.set_feature("guesses", span_id, (id_from, id_to))
 
         if field_name == "SpaceAfter":
             self.spaceafter = False
@@ -195,7 +323,52 @@ class Token:
             self.iso_code = field_value
 
 
-
+# Normalization rules applied in order to every transcription unit, as (label, function, trigger).
+# A rule is skipped when its trigger says that the annotation (always stripped at this point)
+# contains none of the characters the function could act on, so skipping it leaves the annotation
+# unchanged; None means the rule is always applied.
+WARNING_RULES = [
+    ("SYMBOL_NOT_ALLOWED", pt.clean_non_jefferson_symbols, None),         # remove non jefferson symbols
+    ("META_TAGS", pt.meta_tag, pt.contains_any("(){")),                   # transform metalinguistic annotations and shortpauses
+    ("UNEVEN_SPACES", pt.check_spaces, pt.contains_any(" {")),            # remove spaces before and after parentheses
+    ("TRIM_PAUSES", pt.remove_pauses, pt.contains_any("{")),              # remove leading and trailing shortpauses
+    ("TRIM_PROSODICLINKS", pt.remove_prosodiclinks, pt.contains_any("=")), # remove leading and trailing prosodiclinks
+    ("UNEVEN_SPACES", pt.space_prosodiclink, pt.contains_any("=")),       # remove space before or after prosodiclinks
+    ("OVERLAP_PROLONGATION", pt.overlap_prolongations, pt.contains_any("[")), # fix \w+:*[:
+    ("MULTIPLE_SPACES", pt.remove_spaces, pt.has_irregular_spaces),       # remove double spaces
+    ("ACCENTS", pt.replace_che, pt.contains_any("è")),                    # replace chè with ché
+    ("ACCENTS", pt.replace_po, pt.contains_any("ò")),                     # replace pò with po'
+    ("ACCENTS", pt.replace_pero, pt.contains_any("'")),                   # replace o'/e' with ò/è
+    ("NUMBERS", pt.check_numbers, pt.contains_any("0123456789")),         # replace numbers with letters
+]
+
+# Balance checks, as (label, function, trigger): a skipped check cannot produce an error
+ERROR_RULES = [
+    ("UNBALANCED_DOTS", pt.check_even_dots, pt.contains_any("°")),              # check if dots are balanced
+    ("UNBALANCED_PACE", pt.check_angular_parentheses, pt.contains_any("<>")),  # check if angular parentheses are balanced
+    ("UNBALANCED_GUESS", functools.partial(pt.check_normal_parentheses,
+                                           open_char="(", close_char=")"),
+                         pt.contains_any("()")),                                # check if guessing parentheses are balanced
+    ("UNBALANCED_OVERLAP", functools.partial(pt.check_normal_parentheses,
+                                             open_char="[", close_char="]"),
+                           pt.contains_any("[]")),                              # check if overlapping parentheses are balanced
+]
+
+SWITCH_RULES = [
+    (pt.switch_symbols, pt.contains_any(".,?")),
+    (pt.switch_NVB, pt.contains_any("{")),
+]
+
+_LOW_VOLUME = re.compile(r"°[^°]+°")
+_HIGH_VOLUME = re.compile(r"\b[A-ZÀÈÉÌÒÓÙ]+(?:\s+[A-ZÀÈÉÌÒÓÙ]+)*\b")
+_OVERLAPPING = re.compile(r"\[[^\]]+\]")
+_GUESSING = re.compile(r"\([^)]+\)")
+_has_uppercase = pt.contains_any("ABCDEFGHIJKLMNOPQRSTUVWXYZÀÈÉÌÒÓÙ")
+_NON_ALPHABETIC = frozenset("[]()°><-'#")
+_VALID_CHARS = re.compile(r"[^:.,?\[\]()><°]+")
+
+
+@utils.add_slots
 @dataclass
 class TranscriptionUnit:
     tu_id : int
@@ -236,65 +409,48 @@ class TranscriptionUnit:
 
         self.annotation = self.annotation.strip()
 
+        # checked once per unit, debug messages are skipped without building their arguments
+        debug = logger.isEnabledFor(logging.DEBUG)
+
         if self.annotation[:2] == "# ":
             # print(self.annotation)
-            logger.debug("Different language detected in TU %s", self.tu_id)
-            logger.debug("%s >> %s", self.annotation, self.annotation[1:])
+            if debug:
+                logger.debug("Different language detected in TU %s", self.tu_id)
+                logger.debug("%s >> %s", self.annotation, self.annotation[1:])
             self.non_ita = df.languagevariation.some
             self.annotation = self.annotation[1:].strip()
             # print(self.annotation)
             # input()
 
         if self.annotation[:2] == "#_":
-            logger.debug("Different language detected in TU %s", self.tu_id)
-            logger.debug("%s >> %s", self.annotation, self.annotation[1:])
+            if debug:
+                logger.debug("Different language detected in TU %s", self.tu_id)
+                logger.debug("%s >> %s", self.annotation, self.annotation[1:])
             self.non_ita = df.languagevariation.all
             self.annotation = self.annotation[2:].strip()
             return
 
 
-        warning_functions_to_apply = [
-            ("SYMBOL_NOT_ALLOWED", pt.clean_non_jefferson_symbols),   # remove non jefferson symbols
-            ("META_TAGS", pt.meta_tag),                               # transform metalinguistic annotations and shortpauses
-            ("UNEVEN_SPACES", pt.check_spaces),                       # remove spaces before and after parentheses
-            ("TRIM_PAUSES", pt.remove_pauses),                        # remove leading and trailing shortpauses
-            ("TRIM_PROSODICLINKS", pt.remove_prosodiclinks),          # remove leading and trailing prosodiclinks
-            ("UNEVEN_SPACES", pt.space_prosodiclink),                 # remove space before or after prosodiclinks
-            ("OVERLAP_PROLONGATION", pt.overlap_prolongations),       # fix \w+:*[:
-            ("MULTIPLE_SPACES", pt.remove_spaces),                    # remove double spaces
-            ("ACCENTS", pt.replace_che),                              # replace chè with ché
-            ("ACCENTS", pt.replace_po),                               # replace pò with po'
-            ("ACCENTS", pt.replace_pero),                             # replace o'/e' with ò/è
-            ("NUMBERS", pt.check_numbers),                            # replace numbers with letters
-        ]
-
-        error_functions_to_apply = [
-            ("UNBALANCED_DOTS", pt.check_even_dots),                    # check if dots are balanced
-            ("UNBALANCED_PACE", pt.check_angular_parentheses),          # check if angular parentheses are balanced
-            ("UNBALANCED_GUESS", functools.partial(pt.check_normal_parentheses,
-                                                open_char="(", close_char=")")),    # check if guessing parentheses are balanced
-            ("UNBALANCED_OVERLAP", functools.partial(pt.check_normal_parentheses,
-                                                open_char="[", close_char="]")),    # check if overlapping parentheses are balanced
-        ]
-
-        for warning_label, warning_function in warning_functions_to_apply:
-            substitutions, new_transcription = warning_function(self.annotation)
-            if substitutions > 0:
-                logger.debug("Applied %d substitution(s) with function %s", substitutions, warning_function.__name__)
-                logger.debug("%s >> %s", self.annotation, new_transcription)
+        for warning_label, warning_function, trigger in WARNING_RULES:
+            substitutions = 0
+            if trigger is None or trigger(self.annotation):
+                substitutions, new_transcription = warning_function(self.annotation)
+                if debug and substitutions > 0:
+                    logger.debug("Applied %d substitution(s) with function %s", substitutions, warning_function.__name__)
+                    logger.debug("%s >> %s", self.annotation, new_transcription)
+                self.annotation = new_transcription
             self.warnings[warning_label] += substitutions
-            self.annotation = new_transcription
 
-        for error_label, error_function in error_functions_to_apply:
-            self.errors[error_label] = not error_function(self.annotation)
-            if self.errors[error_label]:
+        for error_label, error_function, trigger in ERROR_RULES:
+            self.errors[error_label] = trigger(self.annotation) and not error_function(self.annotation)
+            if debug and self.errors[error_label]:
                 function_name = getattr(error_function, "func", error_function).__name__
                 logger.debug("Function %s produced error", function_name)
 
         # fix spaces before and after dots
         if "°" in self.annotation and not self.errors["UNBALANCED_DOTS"]:
             substitutions, new_transcription = pt.check_spaces_dots(self.annotation)
-            if substitutions > 0:
+            if debug and substitutions > 0:
                 logger.debug("Applying %d substitutions with function check_spaces_dots", substitutions)
                 logger.debug("%s >> %s", self.annotation, new_transcription)
             self.warnings["UNEVEN_SPACES"] += substitutions
@@ -303,7 +459,7 @@ class TranscriptionUnit:
         # fix spaces before and after angular
         if "<" in self.annotation and not self.errors["UNBALANCED_PACE"]:
             substitutions, new_transcription = pt.check_spaces_angular(self.annotation)
-            if substitutions > 0:
+            if debug and substitutions > 0:
                 logger.debug("Applying %d substitutions with function check_spaces_angular", substitutions)
                 logger.debug("%s >> %s", self.annotation, new_transcription)
             self.warnings["UNEVEN_SPACES"] += substitutions
@@ -315,54 +471,53 @@ class TranscriptionUnit:
             self.slow_pace_spans = [x[1] for x in matches_left]
             self.fast_pace_spans = [x[1] for x in matches_right]
 
-            if len(self.slow_pace_spans) + len(self.fast_pace_spans) > 0:
+            if debug and len(self.slow_pace_spans) + len(self.fast_pace_spans) > 0:
                 logger.debug("Found %d varying pace spans", len(self.slow_pace_spans) + len(self.fast_pace_spans))
 
         # check how many low volume spans have been transcribed
         if "°" in self.annotation and not self.errors["UNBALANCED_DOTS"]:
-            matches = list(re.finditer(r"°[^°]+°", self.annotation))
+            matches = list(_LOW_VOLUME.finditer(self.annotation))
             if len(matches)>0:
                 self.low_volume_spans = [match.span() for match in matches]
-                logger.debug("Found %d low volume spans", len(self.low_volume_spans))
+                if debug:
+                    logger.debug("Found %d low volume spans", len(self.low_volume_spans))
 
         # check how many high volume spans have been transcribed
-        matches = list(re.finditer(r"\b[A-ZÀÈÉÌÒÓÙ]+(?:\s+[A-ZÀÈÉÌÒÓÙ]+)*\b", self.annotation))
+        matches = list(_HIGH_VOLUME.finditer(self.annotation)) if _has_uppercase(self.annotation) else []
         if matches:
             self.high_volume_spans = [match.span() for match in matches]
-            logger.debug("Found %d high volume spans", len(self.high_volume_spans))
+            if debug:
+                logger.debug("Found %d high volume spans", len(self.high_volume_spans))
 
         # check how many overlapping spans have been transcribed
         if "[" in self.annotation and not self.errors["UNBALANCED_OVERLAP"]:
-            matches = list(re.finditer(r"\[[^\]]+\]", self.annotation))
+            matches = list(_OVERLAPPING.finditer(self.annotation))
             if len(matches)>0:
                 self.overlapping_spans = [match.span() for match in matches]
-                logger.debug("Found %d overlapping spans", len(self.overlapping_spans))
+                if debug:
+                    logger.debug("Found %d overlapping spans", len(self.overlapping_spans))
 
         # check how many guessing spans have been transcribed
         if "(" in self.annotation and not self.errors["UNBALANCED_GUESS"]:
-            matches = list(re.finditer(r"\([^)]+\)", self.annotation))
+            matches = list(_GUESSING.finditer(self.annotation))
             if len(matches)>0:
                 self.guessing_spans = [match.span() for match in matches]
-                logger.debug("Found %d guessing spans", len(self.guessing_spans))
-
-        # invert [.,?][:-~]
-        substitutions, new_transcription = pt.switch_symbols(self.annotation)
-        if substitutions > 0:
-            logger.debug("Applied %d substitution(s) with function switch_symbols", substitutions)
-            logger.debug("%s >> %s", self.annotation, new_transcription)
-        self.warnings["SWITCHES"] += substitutions
-        self.annotation = new_transcription
-
-        # invert NVB and parentheses
-        substitutions, new_transcription = pt.switch_NVB(self.annotation)
-        if substitutions > 0:
-            logger.debug("Applied %d substitution(s) with function switch_NVB", substitutions)
-            logger.debug("%s >> %s", self.annotation, new_transcription)
-        self.warnings["SWITCHES"] += substitutions
-        self.annotation = new_transcription
+                if debug:
+                    logger.debug("Found %d guessing spans", len(self.guessing_spans))
+
+        # invert [.,?][:-~] and invert NVB and parentheses
+        for switch_function, trigger in SWITCH_RULES:
+            substitutions = 0
+            if trigger(self.annotation):
+                substitutions, new_transcription = switch_function(self.annotation)
+                if debug and substitutions > 0:
+                    logger.debug("Applied %d substitution(s) with function %s", substitutions, switch_function.__name__)
+                    logger.debug("%s >> %s", self.annotation, new_transcription)
+                self.annotation = new_transcription
+            self.warnings["SWITCHES"] += substitutions
 
         # remove unit if it only includes non-alphabetic symbols or is empty
-        if all(c in ["[", "]", "(", ")", "°", ">", "<", "-", "'", "#"] for c in self.annotation):
+        if _NON_ALPHABETIC.issuperset(self.annotation):
             logger.info("Removing TU %s", self.tu_id)
             self.include = False
             return
@@ -372,83 +527,32 @@ class TranscriptionUnit:
         if not self.include:
             return
 
-        logger.debug("Tokenizing TU %s", self.tu_id)
-
         # ! split on space and prosodic links
-        tokens = re.split(r"( |=)", self.annotation)
-        logger.debug("%s >> %s", self.annotation, tokens)
+        spans = pt.scan_tokens(self.annotation)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Tokenizing TU %s", self.tu_id)
+            logger.debug("%s >> %s", self.annotation, spans)
 
-
-        start_pos = 0
-        end_pos = 0
         token_id = -1
+        for start_pos, end_pos, kind in spans:
 
-        for tok in tokens:
-            logger.debug("Extracting token '%s'", tok)
-
-            if len(tok) == 0:
-                logger.error("Empty token")
-                logger.error("TU %s, tokens %s", self.tu_id, tokens)
-            end_pos = start_pos + len(tok)
-            logger.debug("Start: %d, End: %d, %s", start_pos, end_pos, self.annotation[start_pos:end_pos])
-
-            if tok == " ":
-                logger.debug("Skipping space")
-                start_pos = end_pos
+            if kind is df.spantype.space:
                 continue
 
-            if tok == "=":
-                logger.debug("Adding prosodic link to token %s", self.tokens[token_id].text)
+            if kind is df.spantype.prosodiclink:
                 self.tokens[token_id].add_info("ProsodicLink", "Yes")
+                continue
 
-            elif "'" in tok:
-                apostrophe_idx = tok.index("'")
-                prefix = tok[:apostrophe_idx]
-                suffix = tok[apostrophe_idx+1:]
-
-                letter_in_prefix = any(c.isalpha() for c in prefix)
-                letter_in_suffix = any(c.isalpha() for c in suffix)
-
-                logger.debug("Found apostrophe. Prefix: %s, Suffix: %s", prefix, suffix)
-
-                if letter_in_suffix and letter_in_prefix:
-                    subtoken1 = tok[:apostrophe_idx+1]
-                    subtoken2 = tok[apostrophe_idx+1:]
-
-                    start1 = start_pos
-                    end1 = start1 + len(subtoken1)
-                    start2 = end1
-                    end2 = end_pos
-
-                    token_id += 1
-                    new_token = Token(subtoken1, f"{self.tu_id}-{token_id}")
-                    logger.debug("Adding token %s", new_token)
-                    new_token.add_span(start1, end1)
-                    new_token.add_info("SpaceAfter", "No")
-                    logger.debug("Adding spaceafter feature")
-                    self.tokens[token_id] = new_token
-
-                    token_id += 1
-                    new_token = Token(subtoken2, f"{self.tu_id}-{token_id}")
-                    logger.debug("Adding token %s", new_token)
-                    new_token.add_span(start2, end2)
-                    self.tokens[token_id] = new_token
-
-                else:
-                    token_id += 1
-                    new_token = Token(tok, f"{self.tu_id}-{token_id}")
-                    logger.debug("Adding token %s", new_token)
-                    new_token.add_span(start_pos, end_pos)
-                    self.tokens[token_id] = new_token
-
-            else:
-                token_id += 1
-                new_token = Token(tok, f"{self.tu_id}-{token_id}")
-                logger.debug("Adding token %s", new_token)
-                new_token.add_span(start_pos, end_pos)
-                self.tokens[token_id] = new_token
+            if start_pos == end_pos:
+                logger.error("Empty token")
+                logger.error("TU %s, annotation %s", self.tu_id, self.annotation)
 
-            start_pos = end_pos
+            token_id += 1
+            new_token = Token(self.annotation[start_pos:end_pos], f"{self.tu_id}-{token_id}")
+            new_token.add_span(start_pos, end_pos)
+            if kind is df.spantype.elision:
+                new_token.add_info("SpaceAfter", "No")
+            self.tokens[token_id] = new_token
 
         if df.languagevariation.all in self.non_ita:
             logger.debug("Adding dialectal variation to all tokens in TU")
@@ -472,71 +576,59 @@ class TranscriptionUnit:
             self.non_ita = df.languagevariation.all
 
 
-    def add_token_features(self):
-
-        ids = []
-        token_ids = []
-
-        for tok_id, tok in self.tokens.items():
-            i=0
-            for char in tok.orig_text:
-                if char in [":", ".", ",", "?"]:
-                    ids.append(-1)
-                    token_ids.append(-1)
-                elif char in ["[", "]", "(", ")", ">", "<", "°"]:
-                    ids.append(-2)
-                    token_ids.append(-2)
-                else:
-                    ids.append(i)
-                    token_ids.append(tok_id)
-                    i+=1
-
-            ids.append(-3)
-            token_ids.append(-3)
+    def _char_runs(self):
+        """
+        Offset map of the characters of the tokens, written one after the other with a separator
+        after each token. Characters that are not transcription symbols are "valid" and are grouped
+        in runs, each run belonging to a single token.
 
-        for feature_name, spans in [("slow_pace", self.slow_pace_spans),
-                                    ("fast_pace", self.fast_pace_spans),
-                                    ("low_volume", self.low_volume_spans),
-                                    ("high_volume", self.high_volume_spans),
-                                    ("guesses", self.guessing_spans)]:
+        :return: list of `(start, end, token ordinal, position of the first character in the token)`
+            and the list of the ends of the runs, both sorted by offset
+        """
+        runs = []
+        offset = 0
+        for ordinal, tok in enumerate(self.tokens.values()):
+            position = 0
+            for match in _VALID_CHARS.finditer(tok.orig_text):
+                start, end = match.span()
+                runs.append((offset+start, offset+end, ordinal, position))
+                position += end-start
+            offset += len(tok.orig_text)+1
 
-            for span_id, span in enumerate(spans):
-                a, b = span[0], span[1]
+        return runs, [run[1] for run in runs]
 
-                data = list(zip(token_ids[a:b], ids[a:b]))
-                unique_tokens = set(x for x,y in data if x > -1)
-
-                char_ranges = {x:[] for x in unique_tokens}
-                for token_id, pos_id in data:
-                    if token_id in char_ranges:
-                        char_ranges[token_id].append(pos_id)
-
-                for idx in char_ranges:
-                    char_ranges[idx] = (min(char_ranges[idx]), max(char_ranges[idx])+1)
-                    self.tokens[idx].add_info(feature_name, (span_id,
-                                                            char_ranges[idx][0],
-                                                            char_ranges[idx][1]))
+    def add_token_features(self):
 
+        spans = [(feature_name, span_id, span)
+                 for feature_name, feature_spans in [("slow_pace", self.slow_pace_spans),
+                                                     ("fast_pace", self.fast_pace_spans),
+                                                     ("low_volume", self.low_volume_spans),
+                                                     ("high_volume", self.high_volume_spans),
+                                                     ("guesses", self.guessing_spans)]
+                 for span_id, span in enumerate(feature_spans)]
 
         if len(self.overlapping_matches) > 0:
-
             # TODO: handle overlaps only on prolongations
-            for span, match_id in self.overlapping_matches.items():
-                a, b = span[0], span[1]
-
-                data = list(zip(token_ids[a:b], ids[a:b]))
-                unique_tokens = set(x for x,y in data if x > -1)
-
-                char_ranges = {x:[] for x in unique_tokens}
-                for token_id, pos_id in data:
-                    if token_id in char_ranges:
-                        char_ranges[token_id].append(pos_id)
-
-                for id in char_ranges:
-                    char_ranges[id] = (min(char_ranges[id]), max(char_ranges[id])+1)
-                    self.tokens[id].add_info("overlaps", (match_id,
-                                                        char_ranges[id][0],
-                                                        char_ranges[id][1]))
+            spans += [("overlaps", match_id, span) for span, match_id in self.overlapping_matches.items()]
+
+        if len(spans) > 0:
+            runs, run_ends = self._char_runs()
+            tokens = list(self.tokens.values())
+
+            for feature_name, span_id, (a, b) in spans:
+                char_ranges = {}
+                run_id = bisect.bisect_right(run_ends, a)
+                while run_id < len(runs) and runs[run_id][0] < b:
+                    run_start, run_end, ordinal, position = runs[run_id]
+                    start, end = max(a, run_start), min(b, run_end)
+                    if start < end:
+                        char_range = char_ranges.get(ordinal)
+                        char_ranges[ordinal] = (char_range[0] if char_range else position+start-run_start,
+                                                position+end-run_start)
+                    run_id += 1
+
+                for ordinal, (id_from, id_to) in char_ranges.items():
+                    tokens[ordinal].add_info(feature_name, (span_id, id_from, id_to))
 
         # add position of token in TU
         if len(self.tokens) > 0:
@@ -545,6 +637,88 @@ class TranscriptionUnit:
             last_token.position_in_tu = last_token.position_in_tu | df.position.end
 
 
+def _empty_graph():
+    # networkx is only needed once transcripts are processed, it is imported on first use
+    import networkx as nx
+
+    return nx.Graph()
+
+
+@dataclass
+class TimeIndex:
+    positions: np.ndarray
+    starts: np.ndarray
+    ends: np.ndarray
+    positions_by_end: np.ndarray
+    sorted_ends: np.ndarray
+    max_length: float = 0
+
+    @classmethod
+    def from_units(cls, units, positions):
+        positions = np.asarray(positions, dtype=np.int64)
+        starts = np.array([units[i].start for i in positions], dtype=np.float64)
+        ends = np.array([units[i].end for i in positions], dtype=np.float64)
+        max_length = max(float(np.max(ends - starts)), 0) if len(positions) else 0
+
+        by_start = np.argsort(starts, kind="stable")
+        by_end = np.argsort(ends, kind="stable")
+
+        return cls(positions[by_start], starts[by_start], ends[by_start],
+                   positions[by_end], ends[by_end], max_length)
+
+    def _started_in(self, t0, t1, side):
+        # a unit ending after t0 cannot start before t0 - max_length
+        lo = np.searchsorted(self.starts, t0 - self.max_length, side="left")
+        hi = np.searchsorted(self.starts, t1, side=side)
+        return lo, hi
+
+    def between(self, t0, t1):
+        lo, hi = self._started_in(t0, t1, "left")
+        return np.sort(self.positions[lo:hi][self.ends[lo:hi] > t0])
+
+    def at(self, t):
+        lo, hi = self._started_in(t, t, "right")
+        return np.sort(self.positions[lo:hi][self.ends[lo:hi] > t])
+
+    def before(self, t):
+        hi = np.searchsorted(self.sorted_ends, t, side="right")
+        return np.sort(self.positions_by_end[:hi])
+
+
+# statistics computed per minute by Transcript.get_stats, in order: each is either a function returning
+# the value of each unit (in transcript order) from the summary of the transcript, or a pair of
+# statistics whose ratio is computed
+PER_MINUTE_STATISTICS = [
+    ("num_tu", lambda summary: np.ones(len(summary.tokens), dtype=np.int64)),
+    # number of TUs excluding metalinguistic tokens
+    ("num_ling_tu", lambda summary: summary.per_tu(df.tokentype.linguistic) > 0),
+    ("tus_duration_per_minute", lambda summary: summary.durations),
+    ("tokens_per_minute", lambda summary: summary.tokens),
+    ("linguistic_tokens_min", lambda summary: summary.per_tu(df.tokentype.linguistic)),
+    ("metalinguistic_tokens_min", lambda summary: summary.per_tu(df.tokentype.nonverbalbehavior)),
+    ("shortpauses_min", lambda summary: summary.per_tu(df.tokentype.shortpause)),
+    ("errors_min", lambda summary: summary.per_tu(df.tokentype.error)),
+    ("unknown_tokens_min", lambda summary: summary.per_tu(df.tokentype.unknown)),
+    ("avg_tokens_per_min", ("tokens_per_minute", "num_tu")),
+    ("avg_duration_per_min", ("tus_duration_per_minute", "num_tu")),
+    ("intonation_patterns_min", lambda summary: summary.tokens - summary.per_tu(df.intonation.plain)),
+    ("prolongations", lambda summary: summary.per_tu(cols.PROLONGED)),
+    ("high_volume_tokens", lambda summary: summary.per_tu(df.volume.high)),
+    ("low_volume_tokens", lambda summary: summary.per_tu(df.volume.low)),
+    ("high_volume_spans", lambda summary: summary.spans_per_tu("high_volume_spans")),
+    ("low_volume_spans", lambda summary: summary.spans_per_tu("low_volume_spans")),
+    ("differing_volume_spans", lambda summary: summary.spans_per_tu("high_volume_spans") + summary.spans_per_tu("low_volume_spans")),
+    ("slow_pace_spans", lambda summary: summary.spans_per_tu("slow_pace_spans")),
+    ("slow_pace_tokens", lambda summary: summary.per_tu(cols.SLOW_PACE)),
+    ("fast_pace_spans", lambda summary: summary.spans_per_tu("fast_pace_spans")),
+    ("fast_pace_tokens", lambda summary: summary.per_tu(cols.FAST_PACE)),
+    ("differing_pace_spans", lambda summary: summary.spans_per_tu("slow_pace_spans") + summary.spans_per_tu("fast_pace_spans")),
+    ("overlapping_spans", lambda summary: summary.spans_per_tu("overlapping_spans")),
+    ("overlapping_tokens", lambda summary: summary.per_tu(cols.OVERLAPPING)),
+    ("guessing_spans", lambda summary: summary.spans_per_tu("guessing_spans")),
+]
+
+
 @dataclass
 class Transcript:
     tr_id: str
@@ -555,9 +729,13 @@ class Transcript:
     transcription_units: List[TranscriptionUnit] = field(default_factory=lambda: [])
     tot_length: float = 0
     # turns: List[Turn] = field(default_factory=lambda: [])
-    time_based_overlaps: nx.Graph = field(default_factory=lambda: nx.Graph())
-    statistics: pd.DataFrame = None
+    time_based_overlaps: "nx.Graph" = field(default_factory=_empty_graph)
+    statistics: "pd.DataFrame" = None
     overlap_events: Dict[int, Tuple[float, float, int]] = field(default_factory=lambda: {})
+    time_index: Dict[str, TimeIndex] = None
+    token_columns: cols.TokenColumns = None
+    summary: summ.TranscriptSummary = None
+    time_series: summ.TimeSeries = None
 
     def add(self, tu:TranscriptionUnit):
 
@@ -571,6 +749,76 @@ class Transcript:
         self.transcription_units = sorted(self.transcription_units_dict.items(), key=lambda x: x[1].start)
         self.transcription_units = [y for x, y in self.transcription_units]
         self.tot_length = self.transcription_units[-1].end
+        self.time_index = None
+
+    def build_time_index(self):
+        positions_per_speaker = collections.defaultdict(list)
+        for position, tu in enumerate(self.transcription_units):
+            positions_per_speaker[tu.speaker].append(position)
+
+        self.time_index = {None: TimeIndex.from_units(self.transcription_units, range(len(self.transcription_units)))}
+        for speaker, positions in positions_per_speaker.items():
+            self.time_index[speaker] = TimeIndex.from_units(self.transcription_units, positions)
+
+    def _units_from_index(self, speaker, query, *times):
+        if self.time_index is None:
+            self.build_time_index()
+
+        if speaker not in self.time_index:
+            return []
+
+        positions = getattr(self.time_index[speaker], query)(*times)
+        return [self.transcription_units[i] for i in positions]
+
+    def units_between(self, t0, t1, speaker=None):
+        """Units (of `speaker`, if given) overlapping the window between `t0` and `t1`, sorted by start"""
+        return self._units_from_index(speaker, "between", t0, t1)
+
+    def units_at(self, t, speaker=None):
+        """Units (of `speaker`, if given) such that start <= `t` < end, sorted by start"""
+        return self._units_from_index(speaker, "at", t)
+
+    def units_before(self, t, speaker=None):
+        """Units (of `speaker`, if given) ending before or at `t`, sorted by start"""
+        return self._units_from_index(speaker, "before", t)
+
+    def build_token_columns(self):
+        self.token_columns = cols.TokenColumns.from_transcript(self)
+        return self.token_columns
+
+    def get_token_columns(self):
+        if self.token_columns is None:
+            self.build_token_columns()
+        return self.token_columns
+
+    def build_summary(self):
+        self.summary = summ.TranscriptSummary.from_transcript(self)
+        return self.summary
+
+    def get_summary(self):
+        if self.summary is None:
+            self.build_summary()
+        return self.summary
+
+    def build_time_series(self):
+        """
+        The function `build_time_series` stores the cumulative totals of the `PER_MINUTE_STATISTICS` over the
+        units, so that statistics over any time window or subset of speakers can be computed without
+        processing the transcript again (see `summ.TimeSeries.windows`).
+        """
+        summary = self.get_summary()
+        columns = self.get_token_columns()
+        self.time_series = summ.TimeSeries.from_values({name: statistic(summary) if callable(statistic) else None
+                                                        for name, statistic in PER_MINUTE_STATISTICS},
+                                                       columns.tu_end, columns.tu_speaker, columns.speakers,
+                                                       ratios={name: statistic for name, statistic in PER_MINUTE_STATISTICS
+                                                               if not callable(statistic)})
+        return self.time_series
+
+    def get_time_series(self):
+        if self.time_series is None:
+            self.build_time_series()
+        return self.time_series
 
     def purge_speakers(self):
         speakers_to_remove = []
@@ -584,29 +832,38 @@ class Transcript:
 
     def find_overlaps(self, duration_threshold=0):
 
-        G = nx.Graph()
+        G = _empty_graph()
+
+        units = sorted((tu for tu in self.transcription_units if tu.include), key=lambda x: x.start)
 
-        for tu1 in self.transcription_units:
-            for tu2 in self.transcription_units:
-                if tu1.include and tu2.include and tu2.tu_id > tu1.tu_id:
-                    if not tu1.tu_id in G.nodes:
-                        G.add_node(tu1.tu_id, speaker = tu1.speaker, overlaps = tu1.overlapping_spans)
+        if len(units) > 1:
+            for tu in units:
+                G.add_node(tu.tu_id, speaker = tu.speaker, overlaps = tu.overlapping_spans,
+                            start = tu.start, end = tu.end)
 
-                    if not tu2.tu_id in G.nodes:
-                        G.add_node(tu2.tu_id, speaker = tu2.speaker, overlaps = tu2.overlapping_spans)
+        # sweep over units sorted by start, keeping active units in a heap sorted by end:
+        # a unit ending before the current start cannot overlap any of the following ones
+        active = []
+        for position, tu2 in enumerate(units):
+            while active and active[0][0] <= tu2.start:
+                heapq.heappop(active)
 
-                    # De Morgan on tu1.end <= tu2.start or tu2.end <= tu1.start
-                    # the two units overlap in time
-                    if tu1.end > tu2.start and tu2.end > tu1.start:
-                        start = max(tu1.start, tu2.start)
-                        end = min(tu1.end, tu2.end)
-                        duration = min(tu1.end, tu2.end)-max(tu1.start, tu2.start)
+            for _, _, tu1 in active:
+                # De Morgan on tu1.end <= tu2.start or tu2.end <= tu1.start
+                # the two units overlap in time
+                if tu1.end > tu2.start and tu2.end > tu1.start:
+                    start = max(tu1.start, tu2.start)
+                    end = min(tu1.end, tu2.end)
+                    duration = min(tu1.end, tu2.end)-max(tu1.start, tu2.start)
 
-                        G.add_edge(tu1.tu_id, tu2.tu_id,
-                                    start = start,
-                                    end = end,
-                                    duration = duration,
-                                    spans = {tu1.tu_id:None, tu2.tu_id:None})
+                    min_tu, max_tu = sorted([tu1, tu2], key=lambda x: x.tu_id)
+                    G.add_edge(min_tu.tu_id, max_tu.tu_id,
+                                start = start,
+                                end = end,
+                                duration = duration,
+                                spans = {min_tu.tu_id:None, max_tu.tu_id:None})
+
+            heapq.heappush(active, (tu2.end, position, tu2))
 
         self.time_based_overlaps = G
 
@@ -666,9 +923,15 @@ class Transcript:
 
         logger.debug("Graph after removing spurious overlaps: %s", self.time_based_overlaps.number_of_edges())
 
+        # boundaries might have been moved
+        self.time_index = None
+
 
-        cliques = sorted(nx.find_cliques(self.time_based_overlaps), key=lambda x: len(x))
-        cliques = list(filter(lambda x: len(x) > 1, cliques))
+        # the graph is built from time intervals, cliques are found with a sweep over the original boundaries
+        intervals = [(node, attrs["start"], attrs["end"]) for node, attrs in self.time_based_overlaps.nodes(data=True)]
+        adjacency = {node: set(self.time_based_overlaps.neighbors(node)) for node in self.time_based_overlaps.nodes}
+        # members are sorted, so that keys of overlapping times (e.g., "45+47+48") do not depend on the search
+        cliques = sorted((sorted(clique) for clique in ov.maximal_cliques(intervals, adjacency)), key=lambda x: len(x))
 
         self.overlap_events = {}
         logger.info("Found %d cliques", len(cliques))
@@ -786,122 +1049,53 @@ class Transcript:
                     tu.overlap_duration["+".join([str(x) for x in el])] = tu.overlapping_times[el][1]-tu.overlapping_times[el][0]
 
     # Statistic calculations
-    def get_stats (self, annotators_data_csv="data/data_description.csv", split_size=60):
-
+    def compute_stats(self, annotators_data_csv="data/data_description.csv", split_size=60):
+        """
+        The function `compute_stats` computes the statistics of the transcript, per bin of `split_size` seconds,
+        together with its row of annotators' metadata.
+
+        :param annotators_data_csv: path to the table of annotators' metadata, statistics are computed without
+            metadata when it is None or the file does not exist
+        :param split_size: duration of bins, in seconds
+        :return: dictionary mapping the name of each statistic to its value, or to the list of its values per bin
+        """
         stats = {}
 
         stats["num_speakers"] = len(self.speakers) # number of speakers
 
-        # number of TUs
-        stats["num_tu"] = utils.compute_stats_per_minute(self.transcription_units, split_size)
-
-        # number of TUs excluding metalinguistic tokens
-        stats["num_ling_tu"] = utils.compute_stats_per_minute(self.transcription_units, split_size,
-                                                            lambda x: any(token.token_type & df.tokentype.linguistic for token in x.tokens.values()))
-        # durata delle tus per minuto
-        stats["tus_duration_per_minute"] = utils.compute_stats_per_minute(self.transcription_units, split_size,
-                                                                        f2_tu=lambda x: x.duration)
-        # number of tokens per minute
-        stats["tokens_per_minute"] = utils.compute_stats_per_minute(self.transcription_units, split_size,
-                                                                    f2_tu=lambda x: len(x.tokens))
-        # number of linguistic tokens per minute
-        stats["linguistic_tokens_min"] = utils.compute_stats_per_minute(self.transcription_units, split_size,
-                                                                        f2_tu=lambda x: sum(1 for token in x.tokens.values()
-                                                                        if token.token_type == df.tokentype.linguistic))
-        # number of metalinguistic tokens per minute
-        stats["metalinguistic_tokens_min"] = utils.compute_stats_per_minute(self.transcription_units, split_size,
-                                                                        f2_tu=lambda x: sum(1 for token in x.tokens.values()
-                                                                        if token.token_type == df.tokentype.nonverbalbehavior))
-        # number of shortpauses per minute
-        stats["shortpauses_min"] = utils.compute_stats_per_minute(self.transcription_units, split_size,
-                                                                f2_tu=lambda x: sum(1 for token in x.tokens.values()
-                                                                if token.token_type == df.tokentype.shortpause))
-        # number of errors per minute
-        stats["errors_min"] = utils.compute_stats_per_minute(self.transcription_units, split_size,
-                                                            f2_tu=lambda x: sum(1 for token in x.tokens.values()
-                                                            if token.token_type == df.tokentype.error))
-        # number of unknows tokens per minute
-        stats["unknown_tokens_min"] = utils.compute_stats_per_minute(self.transcription_units, split_size,
-                                                                    f2_tu=lambda x: sum(1 for token in x.tokens.values()
-                                                                    if token.token_type == df.tokentype.unknown))
-        # average number of token/minute
-        stats["avg_tokens_per_min"] = []
-        for n_tokens, n_tus in zip(stats["tokens_per_minute"], stats["num_tu"]):
-            if n_tus > 0:
-                stats["avg_tokens_per_min"].append(n_tokens / n_tus)
-            else:
-                stats["avg_tokens_per_min"].append(0)
+        # units are assigned to their time bin once, then all series are accumulated together
+        summary = self.get_summary()
+        bin_starts = utils.time_bins([tu.end for tu in self.transcription_units], split_size)
+        series = utils.binned_series({name: statistic(summary) for name, statistic in PER_MINUTE_STATISTICS
+                                      if callable(statistic)},
+                                     bin_starts)
 
-        # average duration of tus per minute
-        stats["avg_duration_per_min"] = []
-        for n_tokens, n_tus in zip(stats["tus_duration_per_minute"], stats["num_tu"]):
-            if n_tus > 0:
-                stats["avg_duration_per_min"].append(n_tokens / n_tus)
+        for name, statistic in PER_MINUTE_STATISTICS:
+            if callable(statistic):
+                stats[name] = series[name]
             else:
-                stats["avg_duration_per_min"].append(0)
-
-        # intonation pattern al minuto
-        stats["intonation_patterns_min"] = utils.compute_stats_per_minute(self.transcription_units, split_size,
-                                                                        f2_tu=lambda x: sum(1 for token in x.tokens.values() if token.intonation_pattern != df.intonation.plain))
-        # prolongations per minute
-        stats["prolongations"] = utils.compute_stats_per_minute(self.transcription_units, split_size,
-                                                                f2_tu=lambda x: sum(1 for token in x.tokens.values() if token.prolongations))
-        # high volume tokens
-        stats["high_volume_tokens"] = utils.compute_stats_per_minute (self.transcription_units, split_size,
-                                                                    f2_tu=lambda x: sum(1 for token in x.tokens.values()if token.volume is not None and token.volume == df.volume.high))
-        # low volume tokens
-        stats["low_volume_tokens"] = utils.compute_stats_per_minute (self.transcription_units, split_size,
-                                                                    f2_tu=lambda x: sum(1 for token in x.tokens.values() if token.volume is not None and token.volume == df.volume.low))
-        # high volume spans
-        stats["high_volume_spans"] = utils.compute_stats_per_minute(self.transcription_units, split_size,
-                                                                    f2_tu=lambda x:len (x.high_volume_spans))
-        # low volume spans
-        stats["low_volume_spans"] = utils.compute_stats_per_minute(self.transcription_units, split_size,
-                                                                f2_tu=lambda x:len (x.low_volume_spans))
-        # differing volume spans
-        stats["differing_volume_spans"] = utils.compute_stats_per_minute(self.transcription_units, split_size,
-                                                                        f2_tu=lambda x: len(x.high_volume_spans) + len(x.low_volume_spans))
-        # slow pace spans
-        stats["slow_pace_spans"] = utils.compute_stats_per_minute(self.transcription_units, split_size,
-                                                                f2_tu=lambda x:len (x.slow_pace_spans))
-        # slow pace tokens
-        stats["slow_pace_tokens"] = utils.compute_stats_per_minute(self.transcription_units, split_size,
-                                                                f2_tu=lambda x: sum (1 for token in x.tokens.values() if token.slow_pace))
-        # fast pace spans
-        stats["fast_pace_spans"] = utils.compute_stats_per_minute(self.transcription_units, split_size,
-                                                                f2_tu=lambda x:len(x.fast_pace_spans))
-        # fast pace tokens
-        stats["fast_pace_tokens"] = utils.compute_stats_per_minute(self.transcription_units, split_size,
-                                                                f2_tu=lambda x: sum(1 for token in x.tokens.values() if token.fast_pace))
-        # differing pace spans
-        stats["differing_pace_spans"] = utils.compute_stats_per_minute(self.transcription_units, split_size,
-                                                                    f2_tu=lambda x: len(x.slow_pace_spans) + len(x.fast_pace_spans))
-        # overlapping spans
-        stats["overlapping_spans"] = utils.compute_stats_per_minute(self.transcription_units, split_size,
-                                                                    f2_tu=lambda x: len(x.overlapping_spans))
-        # overlapping tokens
-        stats["overlapping_tokens"] = utils.compute_stats_per_minute(self.transcription_units, split_size,
-                                                                    f2_tu=lambda x: sum (1 for token in x.tokens.values() if token.overlaps))
-        # guessing spans
-        stats ["guessing_spans"] = utils.compute_stats_per_minute(self.transcription_units, split_size,
-                                                                f2_tu=lambda x: len(x.guessing_spans))
-
-        # creating an empty dictionary to store statistics
-
-        found = False
-        # open and read the .csv file to extract annotators' data
-        with open(annotators_data_csv, "r", encoding="utf-8") as file:
-            reader = csv.DictReader(file, delimiter="\t")
-            for row in reader:
-                transcript_id = row["NomeFile"]
-                # if transcript_id not in stats:
-                if transcript_id == self.tr_id:
-                    stats["Transcript_ID"] = self.tr_id
-                    stats.update(row)
-                    found = True
-
-        if not found:
-            print(self.tr_id)
+                # ratio of two statistics (e.g., average number of tokens per unit)
+                numerator, denominator = statistic
+                stats[name] = [x / n if n > 0 else 0 for x, n in zip(series[numerator], series[denominator])]
+
+        # annotators' data, read once and shared by all transcripts (see utils.annotators_metadata)
+        metadata = utils.annotators_metadata(annotators_data_csv) if annotators_data_csv else {}
+        if self.tr_id in metadata:
+            stats["Transcript_ID"] = self.tr_id
+            stats.update(metadata[self.tr_id])
+        elif len(metadata) > 0:
+            logger.warning("Transcript %s not found in annotators' metadata", self.tr_id)
+
+        return stats
+
+    def get_stats (self, annotators_data_csv="data/data_description.csv", split_size=60):
+        """
+        The function `get_stats` stores the statistics of the transcript (see `compute_stats`) in `statistics`,
+        as a DataFrame with one row per statistic.
+        """
+        stats = self.compute_stats(annotators_data_csv, split_size)
+
+        import pandas as pd
 
         self.statistics = pd.DataFrame(stats.items(), columns=["Statistic", "Value"])
 
@@ -909,3 +1103,20 @@ class Transcript:
     def __iter__(self):
         for tu in self.transcription_units:
             yield tu
+
+
+def model_signature():
+    """
+    The function `model_signature` summarizes the layout of the data model: the fields of the classes
+    stored in a processed transcript and the members of the flags they use.
+    Objects saved with a different signature (see `serialize.save_transcript`) cannot be restored.
+
+    :return: hexadecimal digest
+    """
+    parts = [f"{cls.__name__}:{','.join(x.name for x in fields(cls))}"
+             for cls in (Token, TranscriptionUnit, TimeIndex, Transcript, cols.TokenColumns, summ.TranscriptSummary,
+                         summ.TimeSeries)]
+    parts.extend(f"{flag.__name__}:{','.join(f'{name}={member.value}' for name, member in flag.__members__.items())}"
+                 for flag in (df.position, df.intonation, df.pace, df.volume, df.tokentype, df.languagevariation))
+
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
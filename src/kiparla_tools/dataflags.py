@@ -32,4 +32,10 @@ class tokentype(Flag):
 class languagevariation(Flag):
 	none = auto()
 	some = auto()
-	all = auto()
\ No newline at end of file
+	all = auto()
+
+class spantype(Flag):
+	word = auto()
+	elision = auto()
+	space = auto()
+	prosodiclink = auto()
@@ -1,29 +1,107 @@
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from dotenv import load_dotenv
 import os
 
-def setup_logging(logger):
+PACKAGE_LOGGER = "kiparla_tools"
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener = None
+
+
+def get_log_level():
 	load_dotenv()
 
-	log_file = os.getenv("LOG_FILE", "kiparla_tools.log")
-	error_file = os.getenv("ERROR_FILE", "kiparla_tools.log")
 	log_level = os.getenv("LOG_LEVEL", "INFO").upper()
+	return getattr(logging, log_level, logging.INFO)
 
-	logger.setLevel(getattr(logging, log_level, logging.INFO))
 
-	file_handler = RotatingFileHandler(log_file, maxBytes=5 * 1024 * 1024, backupCount=3)
-	error_handler = logging.FileHandler(error_file, "w", encoding="utf-8")
-	error_handler.setLevel(logging.ERROR)
+def setup_logging(log_queue=None):
+	"""
+	The function `setup_logging` configures the logger shared by all the modules of the package, once per process.
+	Modules only log records: these are put on a queue and a `QueueListener` thread formats them and writes them
+	to the console and to the log files, so that I/O does not slow down processing.
+
+	:param log_queue: queue receiving the records, e.g. a `multiprocessing.Queue` shared with worker processes
+		(see `setup_worker_logging`), defaults to a new in-process queue
+	:return: the queue receiving the records
+	"""
+	global _listener
+
+	if _listener is not None:
+		return _listener.queue
+
+	load_dotenv()
+
+	log_file = os.getenv("LOG_FILE", "kiparla_tools.log")
+	error_file = os.getenv("ERROR_FILE", "kiparla_tools.log")
+
+	formatter = logging.Formatter(LOG_FORMAT)
 
 	console_handler = logging.StreamHandler()
-	console_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
 	console_handler.setLevel(logging.INFO)
-	logger.addHandler(console_handler)
 
-	formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-	file_handler.setFormatter(formatter)
-	error_handler.setFormatter(formatter)
+	file_handler = RotatingFileHandler(log_file, maxBytes=5 * 1024 * 1024, backupCount=3)
+	handlers = [console_handler, file_handler]
+
+	# errors are already in the log file when the two coincide
+	if os.path.abspath(error_file) != os.path.abspath(log_file):
+		error_handler = logging.FileHandler(error_file, "w", encoding="utf-8")
+		error_handler.setLevel(logging.ERROR)
+		handlers.append(error_handler)
+
+	for handler in handlers:
+		handler.setFormatter(formatter)
+
+	if log_queue is None:
+		log_queue = queue.SimpleQueue()
+
+	package_logger = logging.getLogger(PACKAGE_LOGGER)
+	package_logger.setLevel(get_log_level())
+	package_logger.addHandler(QueueHandler(log_queue))
+
+	_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+	_listener.start()
+	atexit.register(stop_logging)
+
+	return log_queue
+
+
+def setup_worker_logging(log_queue, log_level):
+	"""
+	The function `setup_worker_logging` configures the logger of the package in a worker process: records are
+	only put on `log_queue`, and written by the listener of the process that called `setup_logging`.
+	Handlers inherited from the parent process (e.g., with the "fork" start method) are removed.
+
+	:param log_queue: queue shared with the parent process
+	:param log_level: logging level of the parent process
+	"""
+	global _listener
+
+	_listener = None
+
+	package_logger = logging.getLogger(PACKAGE_LOGGER)
+	for handler in list(package_logger.handlers):
+		package_logger.removeHandler(handler)
+	package_logger.setLevel(log_level)
+	package_logger.addHandler(QueueHandler(log_queue))
+
+
+def stop_logging():
+	"""
+	The function `stop_logging` writes the records still in the queue and stops the listener thread.
+	"""
+	global _listener
+
+	if _listener is not None:
+		package_logger = logging.getLogger(PACKAGE_LOGGER)
+		for handler in list(package_logger.handlers):
+			if isinstance(handler, QueueHandler) and handler.queue is _listener.queue:
+				package_logger.removeHandler(handler)
 
-	logger.addHandler(file_handler)
-	logger.addHandler(error_handler)
\ No newline at end of file
+		_listener.stop()
+		for handler in _listener.handlers:
+			handler.close()
+		_listener = None
@@ -1,16 +1,14 @@
 import kiparla_tools.data as data
 import kiparla_tools.serialize as serialize
 import kiparla_tools.alignment as alignment
+import kiparla_tools.utils as utils
 import itertools
 import logging
 from logging.handlers import RotatingFileHandler
 from dotenv import load_dotenv
 import os
 
-from kiparla_tools.logging_utils import setup_logging
-
 logger = logging.getLogger(__name__)
-setup_logging(logger)
 
 def process_transcript(filename, annotations,
 					duration_threshold = 0.1, tiers_to_ignore = ["Traduzione"]):
@@ -61,9 +59,93 @@ def process_transcript(filename, annotations,
 	for tu in transcript:
 		tu.add_token_features()
 
+	transcript.build_token_columns()
+	transcript.build_summary()
+	transcript.build_time_series()
+
 	return transcript
 
 
+def process_and_write(filename, annotations, output_dir,
+					duration_threshold = 0.1, return_transcript = False, save_transcript = False, return_stats = False,
+					fingerprint = None):
+	"""
+	The function `process_and_write` processes a transcript and writes its CoNLL and linear outputs
+	in `output_dir`. It only takes and returns picklable objects, so that it can be run in a worker process.
+
+	:param filename: path to the CSV file of the transcript
+	:param annotations: units annotations for the transcript (see `process_transcript`)
+	:param output_dir: directory where outputs are written
+	:param duration_threshold: minimum duration of overlaps (see `process_transcript`)
+	:param return_transcript: whether the processed transcript should be returned as well
+	:param save_transcript: whether the processed transcript should be saved in `output_dir` as well
+	(see `serialize.save_transcript`)
+	:param return_stats: whether the statistics of the transcript (see `Transcript.compute_stats`) should be returned
+	instead of the transcript, so that they can be collected without keeping transcripts in memory
+	:param fingerprint: inputs of the transcript (see `input_fingerprint`), stored with its saved copy
+	:return: summary of the transcript (see `serialize.write_transcript`) and the processed transcript
+	(or its statistics), or None if neither `return_transcript` nor `return_stats` is True
+	"""
+	transcript_name = filename.stem
+	transcript = process_transcript(filename, annotations,
+									duration_threshold=duration_threshold,
+									tiers_to_ignore=["Traduzione"])
+	logger.info("Successfully processed %s", transcript_name)
+
+	output_filename_vert = output_dir.joinpath(f"{transcript_name}.vert.tsv")
+	output_filename_tus = output_dir.joinpath(f"{transcript_name}.csv")
+	logger.debug("Writing CoNLL output to %s", output_filename_vert)
+	logger.debug("Writing TUs output to %s", output_filename_tus)
+
+	summary = serialize.write_transcript(transcript, output_filename_vert, output_filename_tus)
+	cache_fname = output_dir.joinpath(f"{transcript_name}{serialize.TRANSCRIPT_CACHE_SUFFIX}")
+	if save_transcript:
+		serialize.save_transcript(transcript, cache_fname, fingerprint)
+	else:
+		# a copy saved by a previous run is now outdated
+		cache_fname.unlink(missing_ok=True)
+
+	if return_stats:
+		return summary, transcript.compute_stats()
+	return summary, transcript if return_transcript else None
+
+
+def input_fingerprint(filename, annotations_fname, duration_threshold = 0.1):
+	"""
+	The function `input_fingerprint` describes everything the outputs of `process_and_write` depend on,
+	so that a transcript can be skipped when its fingerprint did not change since the previous run.
+
+	:param filename: path to the CSV file of the transcript
+	:param annotations_fname: path to the units annotations YAML file of the transcript, or None
+	:param duration_threshold: minimum duration of overlaps (see `process_transcript`)
+	:return: dictionary with the hashes of the input files, the duration threshold and the version of the toolkit
+	"""
+	return {"csv": utils.file_digest(filename),
+			"annotations": utils.file_digest(annotations_fname) if annotations_fname else None,
+			"duration_threshold": duration_threshold,
+			"version": utils.TOOL_VERSION}
+
+
+def load_or_process_transcript(filename, transcripts_dir = None):
+	"""
+	The function `load_or_process_transcript` restores a transcript from the copy saved by `process_and_write`
+	in `transcripts_dir`, if it was processed from the same CSV file with no annotations and the default duration
+	threshold, otherwise it processes the CSV file, so that the transcript is the same in both cases.
+
+	:param filename: path to the CSV file of the transcript
+	:param transcripts_dir: directory with the saved transcripts, or None
+	:return: processed transcript
+	"""
+	if transcripts_dir:
+		cache_fname = transcripts_dir.joinpath(f"{filename.stem}{serialize.TRANSCRIPT_CACHE_SUFFIX}")
+		if cache_fname.is_file():
+			transcript = serialize.load_transcript(cache_fname, input_fingerprint(filename, None))
+			if transcript is not None:
+				return transcript
+
+	return process_transcript(filename, {})
+
+
 def align_transcripts(transcripts_dict, output_folder):
 	for i, t_a in enumerate(list(transcripts_dict.keys())[:-1]):
 		t_a_name = t_a.split("_")[1]
@@ -0,0 +1,94 @@
+"""Functions to find overlap events among transcription units"""
+
+
+def interval_cliques(intervals):
+	"""
+	The function `interval_cliques` sweeps over the sorted endpoints of a set of intervals and yields
+	the maximal groups of intervals that are active at the same time.
+	Intervals sharing only an endpoint do not overlap. Intervals with `end <= start` are treated as
+	points placed on their end, so that every group of pairwise overlapping intervals is always
+	contained in (at least) one of the yielded groups.
+
+	:param intervals: iterable of `(node, start, end)` triples
+	:return: generator of lists of nodes, in order of start
+	"""
+
+	events = []
+	for position, (node, start, end) in enumerate(intervals):
+		if end > start:
+			events.append((start, 2, position, False, node))
+			events.append((end, 0, position, True, node))
+		else:
+			events.append((end, 1, position, False, node))
+			events.append((end, 1, position, True, node))
+	events.sort(key=lambda x: x[:4])
+
+	active = {}
+	grown = False
+	for _, _, _, is_end, node in events:
+		if is_end:
+			if grown:
+				yield list(active)
+				grown = False
+			del active[node]
+		else:
+			active[node] = None
+			grown = True
+
+
+def _bron_kerbosch(clique, candidates, excluded, adjacency):
+	if not candidates and not excluded:
+		yield clique
+		return
+
+	pivot = max(candidates | excluded, key=lambda x: len(adjacency[x] & candidates))
+	for node in sorted(candidates - adjacency[pivot], key=str):
+		yield from _bron_kerbosch(clique + [node],
+								candidates & adjacency[node],
+								excluded & adjacency[node],
+								adjacency)
+		candidates.remove(node)
+		excluded.add(node)
+
+
+def maximal_cliques(intervals, adjacency):
+	"""
+	The function `maximal_cliques` lists the maximal cliques of a time-based overlap graph.
+	Candidate cliques are found with a sweep over the intervals (see `interval_cliques`): when all
+	the edges of a candidate are in `adjacency` the candidate is used as is, otherwise (i.e., some
+	edges have been pruned) its maximal cliques are searched in the subgraph induced by the candidate.
+
+	:param intervals: iterable of `(node, start, end)` triples, with the times used to build the graph
+	:param adjacency: dictionary mapping each node to the set of its neighbours
+	:return: list of cliques with more than one node, each as a list of nodes, in order of discovery
+	"""
+
+	cliques = []
+	seen = set()
+
+	for candidate in interval_cliques(intervals):
+		if len(candidate) < 2:
+			continue
+
+		candidate_set = set(candidate)
+		if all(len(adjacency[node] & candidate_set) == len(candidate)-1 for node in candidate):
+			parts = [candidate]
+		else:
+			sub_adjacency = {node: adjacency[node] & candidate_set for node in candidate}
+			parts = [sorted(part, key=candidate.index)
+					for part in _bron_kerbosch([], candidate_set, set(), sub_adjacency)]
+
+		for part in parts:
+			key = frozenset(part)
+			if len(part) > 1 and key not in seen:
+				seen.add(key)
+				cliques.append(part)
+
+	# a clique found inside a candidate might be included in a clique coming from another candidate
+	by_node = {}
+	for clique in cliques:
+		for node in clique:
+			by_node.setdefault(node, []).append(frozenset(clique))
+
+	return [clique for clique in cliques
+			if not any(frozenset(clique) < other for other in by_node[clique[0]])]
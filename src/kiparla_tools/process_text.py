@@ -1,22 +1,67 @@
+import functools
+import os
+
 import regex as re
-import num2words
+import yaml
+
+import kiparla_tools.dataflags as df
+
+ACCENTS_FNAME = os.path.join(os.path.dirname(__file__), "accents.yaml")
+
+_TABS = re.compile(r"\t+")
+_NEWLINES = re.compile(r"\n+")
+_MULTIPLE_SPACES = re.compile(r"\s\s+")
+_PO = re.compile(r"\bp([^ =\p{L}]*)ò\b")
+_EDGE_PAUSES = re.compile(r"^([\[\]()<>°]?)\s*\{P\}\s*|\s*\{P\}\s*([\[\]()<>°]?)$")
+_SWITCHED_SYMBOLS = re.compile(r"([.,?])([:-~])")
+_SWITCHED_NVB = re.compile(r"([\[\(])(\{\w+\})|(\{\w+\})([\]\)])")
+_OVERLAP_PROLONGATION = re.compile(r"(\w:*)\[:")
+_NON_JEFFERSON = re.compile(r"[^{}_,\?.:=°><\[\]\(\)\w\s'\-~$#@]")
+_SPACE_AFTER_OPENING = re.compile(r"([\[\(]) ([^ ])")
+_SPACE_BEFORE_CLOSING = re.compile(r"([^ ]) ([\)\]])")
+_SPACE_BEFORE_PUNCTUATION = re.compile(r"([^ ]) ([.,:?])")
+_MISSING_SPACE_BEFORE_META = re.compile(r"([^ \[\(<>°])(\{[^}]+\})")
+_MISSING_SPACE_AFTER_META = re.compile(r"(\{[^}]+\})([^ \]\)<>°])")
+_META_COMMENT = re.compile(r"\{([\w ]+)\}")
+_LOW_VOLUME = re.compile(r"(°[^°]+°)")
+_NUMBERS = re.compile(r"\b[0-9]+\b")
+_SEPARATORS = re.compile(r"[ =]")
+_LETTER = re.compile(r"\p{L}")
+_SPACED_PROSODICLINK = re.compile(r" =|= ")
+_EDGE_PROSODICLINKS = re.compile(r"^([\[\]()<>°]?)\s*=\s*|\s*=\s*([\[\]()<>°]?)$")
+
+
+def contains_any(chars):
+	"""
+	The function `contains_any` builds a cheap test telling whether a transcription contains at least
+	one of `chars`, used to skip normalization functions that cannot change the transcription.
+
+	:param chars: string of characters
+	:return: function taking a transcription and returning a boolean
+	"""
+	chars = frozenset(chars)
+	return lambda transcription: not chars.isdisjoint(transcription)
+
+def has_irregular_spaces(transcription):
+	# anything but the ASCII space is a separator or a control character and therefore not printable
+	return "  " in transcription or not transcription.isprintable()
 
 def remove_spaces(transcription):
 	tot_subs = 0
 
-	new_string, subs_made = re.subn(r"\t+", "", transcription)
+	new_string, subs_made = _TABS.subn("", transcription)
 	if subs_made > 0:
 		tot_subs += subs_made
 		transcription = new_string
 
 	# removing newlines
-	new_string, subs_made = re.subn(r"\n+", "", transcription)
+	new_string, subs_made = _NEWLINES.subn("", transcription)
 	if subs_made > 0:
 		tot_subs += subs_made
 		transcription = new_string
 
 	# removing double spaces
-	new_string, subs_made = re.subn(r"\s\s+", " ", transcription)
+	new_string, subs_made = _MULTIPLE_SPACES.subn(" ", transcription)
 	if subs_made > 0:
 		tot_subs += subs_made
 		transcription = new_string
@@ -26,7 +71,7 @@ def remove_spaces(transcription):
 # transform "pò" into "po'" (keep count)
 def replace_po(transcription):
 	tot_subs = 0
-	new_string, subs_made = re.subn(r"\bp([^ =\p{L}]*)ò\b", r"p\1o'", transcription)
+	new_string, subs_made = _PO.subn(r"p\1o'", transcription)
 
 	if subs_made > 0:
 		tot_subs += subs_made
@@ -34,73 +79,92 @@ def replace_po(transcription):
 
 	return tot_subs, transcription.strip()
 
-def replace_che(transcription):
+class SubstitutionTable:
+	"""
+	Ordered list of `(word, pattern, replacement)` rules, with a single alternation of all the
+	patterns used as a prefilter: when the alternation does not match, none of the rules would apply.
+	Rules only ever replace the last character of a match, so they cannot create matches for
+	other rules and checking the original transcription is enough.
+	"""
 
-	words_to_replace = {"perchè": "perché",
-						"benchè": "benché",
-						"finchè": "finché",
-						"poichè": "poché",
-						"anzichè": "anziché",
-						"dopodichè": "dopodiché",
-						"granchè": "granché",
-						"fourchè": "fuoché",
-						"affinchè": "affinché",
-						"pressochè": "pressoché",
-						"nè": "né"}
+	def __init__(self, rules):
+		self.rules = rules
+		self.prefilter = re.compile("|".join(f"(?:{pattern.pattern})" for _, pattern, _ in rules))
 
-	tot_subs = 0
+	def apply(self, transcription):
+		"""
+		:param transcription: string to normalize
+		:return: dictionary with the number of substitutions made by each rule, new transcription
+		"""
+		subs = {}
+		if not self.prefilter.search(transcription):
+			return subs, transcription
 
-	for word, substitute in words_to_replace.items():
+		for word, pattern, replacement in self.rules:
+			new_string, subs_made = pattern.subn(replacement, transcription)
+			if subs_made > 0:
+				subs[word] = subs_made
+				transcription = new_string
 
-		new_word = "\\b"
-		sub_word = ""
-		for char_id, char in enumerate(word):
-			new_word += "([^ =']*)" + char
-			sub_word = sub_word + "\\" + str(char_id+1) + char
-		new_word += "\\b"
+		return subs, transcription
 
-		sub_word = sub_word[:-1] + "é"
 
-		new_word = re.compile(new_word)
-		new_string, subs_made = re.subn(new_word, rf"{sub_word}", transcription)
+@functools.lru_cache(maxsize=None)
+def load_substitution_tables(fname=ACCENTS_FNAME):
+	"""
+	The function `load_substitution_tables` reads the accent substitution tables from a YAML file.
+	Tables are read and compiled only once.
 
-		if subs_made > 0:
-			tot_subs += subs_made
-			transcription = new_string
-	return tot_subs, transcription
+	:param fname: path to the YAML file, defaults to the one shipped with the package
+	:return: dictionary mapping the name of each table to a `SubstitutionTable`
+	"""
 
-def replace_pero(transcription):
+	with open(fname, encoding="utf-8") as fin:
+		tables = yaml.safe_load(fin)
 
-	words_to_replace = {"pero'": "però",
-						"perche'": "perché",
-						"puo'": "può",}
+	return {"che": SubstitutionTable([_che_rule(word, substitute) for word, substitute in tables["che"].items()]),
+			"pero": SubstitutionTable([_pero_rule(word, substitute) for word, substitute in tables["pero"].items()])}
 
-	tot_subs = 0
-	for word, substitute in words_to_replace.items():
-		new_word = f"\\b{word[0]}"
-		sub_word = f"{word[0]}"
-		for char_id, char in enumerate(word[1:-1]):
-			new_word += "([^ =]*)" + char
-			sub_word = sub_word + "\\" + str(char_id+1) + char
 
-		new_word += "([^ =]*)" + word[-1]
+def _che_rule(word, substitute):
+	# symbols are allowed before each character
+	new_word = "\\b"
+	sub_word = ""
+	for char_id, char in enumerate(word):
+		new_word += "([^ =']*)" + re.escape(char)
+		sub_word = sub_word + "\\" + str(char_id+1) + char
+	new_word += "\\b"
 
-		sub_word = sub_word[:-1] + substitute[-1]
+	sub_word = sub_word[:-1] + substitute[-1]
 
-		new_word = re.compile(new_word)
-		new_string, subs_made = re.subn(new_word, rf"{sub_word}", transcription)
+	return word, re.compile(new_word), sub_word
 
-		if subs_made > 0:
-			tot_subs += subs_made
-			transcription = new_string
-	return tot_subs, transcription
+def _pero_rule(word, substitute):
+	# symbols are allowed after the first character, the final apostrophe becomes an accented vowel
+	new_word = f"\\b{re.escape(word[0])}"
+	sub_word = f"{word[0]}"
+	for char_id, char in enumerate(word[1:-1]):
+		new_word += "([^ =]*)" + re.escape(char)
+		sub_word = sub_word + "\\" + str(char_id+1) + char
+
+	new_word += "([^ =]*)" + re.escape(word[-1])
+
+	sub_word = sub_word[:-1] + substitute[-1]
+
+	return word, re.compile(new_word), sub_word
+
+def replace_che(transcription):
+	subs, transcription = load_substitution_tables()["che"].apply(transcription)
+	return sum(subs.values()), transcription
+
+def replace_pero(transcription):
+	subs, transcription = load_substitution_tables()["pero"].apply(transcription)
+	return sum(subs.values()), transcription
 
 # remove initial and final pauses (keep count)
 def remove_pauses(transcription):
 	tot_subs = 0
-	new_string, subs_made = re.subn(r"^([\[\]()<>°]?)\s*\{P\}\s*|\s*\{P\}\s*([\[\]()<>°]?)$",
-									r"\1\2",
-									transcription)
+	new_string, subs_made = _EDGE_PAUSES.subn(r"\1\2", transcription)
 
 	if subs_made > 0:
 		tot_subs += subs_made
@@ -111,9 +175,7 @@ def remove_pauses(transcription):
 
 def switch_symbols(transcription):
 	tot_subs = 0
-	new_string, subs_made = re.subn(r"([.,?])([:-~])",
-									r"\2\1",
-									transcription)
+	new_string, subs_made = _SWITCHED_SYMBOLS.subn(r"\2\1", transcription)
 
 	if subs_made > 0:
 		tot_subs += subs_made
@@ -124,17 +186,9 @@ def switch_symbols(transcription):
 
 def switch_NVB(transcription):
 	tot_subs = 0
-	new_string, subs_made = re.subn(r"([\[\(])(\{\w+\})",
-									r"\2\1",
-									transcription)
-
-	if subs_made > 0:
-		tot_subs += subs_made
-		transcription = new_string
-
-	new_string, subs_made = re.subn(r"(\{\w+\})([\]\)])",
-									r"\2\1",
-									transcription)
+	# opening parenthesis before NVB or closing parenthesis after NVB, in a single pass
+	new_string, subs_made = _SWITCHED_NVB.subn(lambda m: m.group(2)+m.group(1) if m.group(1) else m.group(4)+m.group(3),
+												transcription)
 
 	if subs_made > 0:
 		tot_subs += subs_made
@@ -146,9 +200,7 @@ def switch_NVB(transcription):
 def overlap_prolongations(transcription):
 	tot_subs = 0
 
-	new_string, subs_made = re.subn(r"(\w:*)\[:",
-									r"[\1:",
-									transcription)
+	new_string, subs_made = _OVERLAP_PROLONGATION.subn(r"[\1:", transcription)
 
 	if subs_made > 0:
 		tot_subs += subs_made
@@ -161,9 +213,7 @@ def overlap_prolongations(transcription):
 # TODO: numeri?
 def clean_non_jefferson_symbols(transcription):
 	tot_subs = 0
-	new_string, subs_made = re.subn(r"[^{}_,\?.:=°><\[\]\(\)\w\s'\-~$#@]",
-									"",
-									transcription) # keeping also the apostrophe, # and $
+	new_string, subs_made = _NON_JEFFERSON.subn("", transcription) # keeping also the apostrophe, # and $
 
 	if subs_made > 0:
 		tot_subs += subs_made
@@ -224,31 +274,31 @@ def check_spaces(transcription):
 	tot_subs = 0
 
 	# "[ ([^ ])" -> [$1
-	new_string, subs_made = re.subn(r"([\[\(]) ([^ ])", r"\1\2", transcription)
+	new_string, subs_made = _SPACE_AFTER_OPENING.subn(r"\1\2", transcription)
 	if subs_made > 0:
 		tot_subs += subs_made
 		transcription = new_string
 
 	# "([^ ]) ]" -> $1]
-	new_string, subs_made = re.subn(r"([^ ]) ([\)\]])", r"\1\2", transcription)
+	new_string, subs_made = _SPACE_BEFORE_CLOSING.subn(r"\1\2", transcription)
 	if subs_made > 0:
 		tot_subs += subs_made
 		transcription = new_string
 
 	# "[^ ] [.,:?]" -> $1$2
-	new_string, subs_made = re.subn(r"([^ ]) ([.,:?])", r"\1\2", transcription)
+	new_string, subs_made = _SPACE_BEFORE_PUNCTUATION.subn(r"\1\2", transcription)
 	if subs_made > 0:
 		tot_subs += subs_made
 		transcription = new_string
 
 	# "[^ \[\(<>°](.)" -> $1 (.)
-	new_string, subs_made = re.subn(r"([^ \[\(<>°])(\{[^}]+\})", r"\1 \2", transcription)
+	new_string, subs_made = _MISSING_SPACE_BEFORE_META.subn(r"\1 \2", transcription)
 	if subs_made > 0:
 		tot_subs += subs_made
 		transcription = new_string
 
 	# "(.)[^ \]]" -> (.) $1
-	new_string, subs_made = re.subn(r"(\{[^}]+\})([^ \]\)<>°])", r"\1 \2", transcription)
+	new_string, subs_made = _MISSING_SPACE_AFTER_META.subn(r"\1 \2", transcription)
 	if subs_made > 0:
 		tot_subs += subs_made
 		transcription = new_string
@@ -256,7 +306,7 @@ def check_spaces(transcription):
 	return tot_subs, transcription.strip()
 
 def check_spaces_dots(transcription):
-	matches = re.split(r"(°[^°]+°)", transcription)
+	matches = _LOW_VOLUME.split(transcription)
 	matches = [x for x in matches if len(x)>0]
 	subs = 0
 	if len(matches)>0:
@@ -393,42 +443,36 @@ def matches_angular(transcription):
 
 	return matches_left_ret, matches_right_ret
 
-def check_numbers(transcription):
-
-	matches = list(re.finditer(r"\b[0-9]+\b", transcription))
-	spans = [match.span() for match in matches]
-
-	if len(spans) == 0:
-		return 0, transcription
+NUMBERS_CACHE_SIZE = 4096
 
+def _number_to_words(number):
+	import num2words
 
-	shifted_spans = [(0, spans[0][0])]
-	if len(spans) > 1:
-		i=0
-		j=1
-		while j < len(spans):
-			shifted_spans.append((spans[i][1], spans[j][0]))
-			i+=1
-			j+=1
-	shifted_spans.append((spans[-1][1], len(transcription)))
+	sub = num2words.num2words(number, lang="it")
+	if sub.endswith("tre") and len(sub)>3:
+		sub = sub[:-1]+"é"
+	return sub
 
-	translations = []
-	for match in matches:
-		sub = num2words.num2words(match.group(0), lang="it")
-		if sub.endswith("tre") and len(sub)>3:
-			sub = sub[:-1]+"é"
-		translations.append(sub)
+@functools.lru_cache(maxsize=None)
+def _small_numbers():
+	# numbers up to four digits cover years, ages and most quantities
+	return [_number_to_words(number) for number in range(10000)]
 
-	i=0
-	new_transcription = ""
-	while i<len(translations):
-		new_transcription+=transcription[shifted_spans[i][0]:shifted_spans[i][1]]
-		new_transcription+=translations[i]
-		i+=1
+@functools.lru_cache(maxsize=NUMBERS_CACHE_SIZE)
+def number_to_words(digits):
+	"""
+	The function `number_to_words` spells out a string of digits in Italian.
 
-	new_transcription+=transcription[shifted_spans[i][0]:shifted_spans[i][1]]
+	:param digits: string of ASCII digits
+	:return: the number in letters, with an acute accent on final "tre" (e.g., "ventitré")
+	"""
+	if len(digits) <= 4:
+		return _small_numbers()[int(digits)]
+	return _number_to_words(digits)
 
-	return len(matches), new_transcription
+def check_numbers(transcription):
+	new_transcription, subs_made = _NUMBERS.subn(lambda match: number_to_words(match.group(0)), transcription)
+	return subs_made, new_transcription
 
 def replace_spaces(match):
 	return '{' + match.group(1).replace(' ', '_') + '}'
@@ -441,20 +485,20 @@ def meta_tag(transcription):
 	subs = 0
 
 	for old_string, new_string in subs_map.items():
-		sub_annotation, subs_made = re.subn(re.escape(old_string), new_string, transcription)
-		transcription = sub_annotation
-		subs += subs_made
+		subs_made = transcription.count(old_string)
+		if subs_made > 0:
+			transcription = transcription.replace(old_string, new_string)
+			subs += subs_made
 
-		# replace spaces with _ in comments
-		transcription = re.sub(r"\{([\w ]+)\}", replace_spaces, transcription)
+	# replace spaces with _ in comments
+	# (comments never include parentheses, a single pass after all substitutions is enough)
+	transcription = _META_COMMENT.sub(replace_spaces, transcription)
 
 	return subs, transcription
 
 def space_prosodiclink(transcription):
 	tot_subs = 0
-	new_string, subs_made = re.subn(r" =|= ",
-									r"=",
-									transcription)
+	new_string, subs_made = _SPACED_PROSODICLINK.subn(r"=", transcription)
 
 	if subs_made > 0:
 		tot_subs += subs_made
@@ -464,9 +508,7 @@ def space_prosodiclink(transcription):
 
 def remove_prosodiclinks(transcription):
 	tot_subs = 0
-	new_string, subs_made = re.subn(r"^([\[\]()<>°]?)\s*=\s*|\s*=\s*([\[\]()<>°]?)$",
-									r"\1\2",
-									transcription)
+	new_string, subs_made = _EDGE_PROSODICLINKS.subn(r"\1\2", transcription)
 
 	if subs_made > 0:
 		tot_subs += subs_made
@@ -474,5 +516,36 @@ def remove_prosodiclinks(transcription):
 
 	return tot_subs, transcription.strip()
 
+def _word_spans(transcription, start, end):
+	# words such as "l'amico" are split after the first apostrophe when it has letters on both sides
+	apostrophe_idx = transcription.find("'", start, end)
+	if apostrophe_idx > -1 and \
+		_LETTER.search(transcription, start, apostrophe_idx) and \
+		_LETTER.search(transcription, apostrophe_idx+1, end):
+		return [(start, apostrophe_idx+1, df.spantype.elision), (apostrophe_idx+1, end, df.spantype.word)]
+	return [(start, end, df.spantype.word)]
+
+def scan_tokens(transcription):
+	"""
+	The function `scan_tokens` splits a transcription on spaces and prosodic links with a single scan.
+	Consecutive separators produce empty words, as `re.split` would.
+
+	:param transcription: normalized transcription
+	:return: list of `(start, end, kind)` triples covering the whole transcription, where `kind` is a
+		`dataflags.spantype`: `elision` marks a word directly followed by the next one (e.g., "l'")
+	"""
+	spans = []
+	start = 0
+	for match in _SEPARATORS.finditer(transcription):
+		spans.extend(_word_spans(transcription, start, match.start()))
+		if match.group(0) == " ":
+			spans.append((match.start(), match.end(), df.spantype.space))
+		else:
+			spans.append((match.start(), match.end(), df.spantype.prosodiclink))
+		start = match.end()
+	spans.extend(_word_spans(transcription, start, len(transcription)))
+
+	return spans
+
 if __name__ == "__main__":
 	print(replace_che("n'è"))
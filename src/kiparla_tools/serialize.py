@@ -1,23 +1,33 @@
 import csv
+import functools
+import json
+import os
+import pickle
+import zlib
+from xml.etree import ElementTree
 from ast import literal_eval
+import numpy as np
 import regex as re
-import pandas as pd
 import yaml
-from speach import elan
-from pympi import Elan as EL
 import logging
 import collections
 
 from kiparla_tools import data
 from kiparla_tools import dataflags as df
-from kiparla_tools.logging_utils import setup_logging
+from kiparla_tools import utils
 
 from kiparla_tools.config_parameters import (
-	CONLL_FIELDNAMES
+	CONLL_FIELDNAMES,
+	LINEAR_FIELDNAMES
 )
 
 logger = logging.getLogger(__name__)
-setup_logging(logger)
+
+MANIFEST_FNAME = "manifest.json"
+TRANSCRIPT_CACHE_SUFFIX = ".transcript.cache"
+JEFFERSON_CACHE_SIZE = 1024
+# to be increased whenever processing changes the content of transcripts without changing the data model
+TRANSCRIPT_CACHE_VERSION = 2
 
 
 
@@ -140,41 +150,338 @@ def units_from_conll(fobj, source_col="unit"):
 		yield curr_unit, curr_sent
 
 
+class CorpusStatistics:
+	"""
+	The class `CorpusStatistics` collects the statistics of the transcripts of a corpus (see
+	`Transcript.compute_stats`) into a table with one row per transcript: each statistic computed per bin
+	is widened into `statistic::bin` columns, padded with 0 for shorter transcripts.
+	Values are appended straight into columnar buffers (grown when needed), so that transcripts
+	do not need to be kept in memory, and the table is written at once.
+	"""
+
+	# position of the series, among the other columns of a row
+	_SERIES = object()
+
+	def __init__(self, capacity=64, n_bins=64):
+		self._capacity = capacity
+		self._n_bins = n_bins
+		self._n_rows = 0
+		self._filled = np.zeros(capacity, dtype=bool)
+		self._lengths = np.zeros(capacity, dtype=np.int64)
+		self._row_columns = [None] * capacity
+		self._scalars = {}
+		self._series = {}
+		self._float_bins = {}
+
+	def _grow(self, n_rows, n_bins):
+		if n_rows > self._capacity:
+			capacity = max(n_rows, 2*self._capacity)
+			self._filled = np.concatenate([self._filled, np.zeros(capacity - self._capacity, dtype=bool)])
+			self._lengths = np.concatenate([self._lengths, np.zeros(capacity - self._capacity, dtype=np.int64)])
+			self._row_columns.extend([None] * (capacity - self._capacity))
+			for values in self._scalars.values():
+				values.extend([None] * (capacity - self._capacity))
+			for name, buffer in self._series.items():
+				self._series[name] = np.concatenate([buffer, np.zeros((capacity - self._capacity, buffer.shape[1]))])
+			self._capacity = capacity
+
+		if n_bins > self._n_bins:
+			self._n_bins = max(n_bins, 2*self._n_bins)
+			for name, buffer in self._series.items():
+				self._series[name] = np.concatenate([buffer, np.zeros((self._capacity, self._n_bins - buffer.shape[1]))],
+													axis=1)
+				self._float_bins[name] = np.concatenate([self._float_bins[name],
+														np.zeros(self._n_bins - len(self._float_bins[name]), dtype=bool)])
+
+	def append(self, stats, position=None):
+		"""
+		The function `append` adds the statistics of a transcript to the table.
+
+		:param stats: dictionary mapping the name of each statistic to its value, or to the list of its values per bin
+		:param position: row of the transcript (e.g., position of its input file), defaults to the next row.
+			Rows never filled (e.g., transcripts that could not be processed) are not written
+		"""
+		row = self._n_rows if position is None else position
+		n_bins = max((len(value) for value in stats.values() if type(value) is list), default=0)
+		self._grow(row+1, n_bins)
+		self._n_rows = max(self._n_rows, row+1)
+
+		columns = []
+		for name, value in stats.items():
+			if type(value) is list:
+				if name not in self._series:
+					self._series[name] = np.zeros((self._capacity, self._n_bins), dtype=np.float64)
+					self._float_bins[name] = np.zeros(self._n_bins, dtype=bool)
+				self._series[name][row, :len(value)] = value
+				self._float_bins[name][:len(value)] |= [type(x) is float for x in value]
+			else:
+				if name not in self._scalars:
+					self._scalars[name] = [None] * self._capacity
+				self._scalars[name][row] = value
+				columns.append(name)
+
+		self._filled[row] = True
+		self._lengths[row] = n_bins
+		self._row_columns[row] = columns
+
+	def add_transcript(self, transcript, position=None, **kwargs):
+		"""Adds the statistics of `transcript`, keyword arguments are passed to `Transcript.compute_stats`"""
+		self.append(transcript.compute_stats(**kwargs), position=position)
+
+	def _layout(self):
+		rows = np.flatnonzero(self._filled[:self._n_rows])
+		n_bins = int(self._lengths[rows].max()) if len(rows) else 0
+
+		# columns are ordered as they first appear in rows, series following the other columns of each row
+		order = {}
+		for row in rows:
+			for name in self._row_columns[row] + [self._SERIES]:
+				order.setdefault(name, len(order))
+
+		return rows, n_bins, list(order)
+
+	def write_tsv(self, output_filename, sep="\t"):
+		"""
+		The function `write_tsv` writes the table in tab-separated format. Statistics that are integers in all
+		transcripts are written as integers, missing values (e.g., transcripts without metadata) as empty cells.
+
+		:param output_filename: path to the output file
+		:param sep: separator of the output file
+		"""
+		rows, n_bins, order = self._layout()
+
+		header = []
+		columns = []
+		for name in order:
+			if name is self._SERIES:
+				for series_name, buffer in self._series.items():
+					header.extend(f"{series_name}::{x}" for x in range(n_bins))
+					values = buffer[rows, :n_bins]
+					columns.extend(values[:, x].tolist() if self._float_bins[series_name][x]
+									else values[:, x].astype(np.int64).tolist()
+									for x in range(n_bins))
+			else:
+				header.append(name)
+				values = [self._scalars[name][row] for row in rows]
+				if any(type(x) is float for x in values) or \
+					(any(x is None for x in values) and any(type(x) is int for x in values)):
+					values = [float(x) if x is not None else None for x in values]
+				columns.append(["" if x is None else x for x in values])
+
+		with open(output_filename, "w", encoding="utf-8", newline="") as fout:
+			writer = csv.writer(fout, delimiter=sep, lineterminator="\n")
+			writer.writerow(header)
+			writer.writerows(zip(*columns))
+
+	def to_dataframe(self):
+		"""
+		The function `to_dataframe` builds a pandas DataFrame with the same columns as `write_tsv`.
+		"""
+		import pandas as pd
+
+		rows, n_bins, order = self._layout()
+
+		columns = {}
+		for name in order:
+			if name is self._SERIES:
+				for series_name, buffer in self._series.items():
+					for x in range(n_bins):
+						values = buffer[rows, x]
+						columns[f"{series_name}::{x}"] = values if self._float_bins[series_name][x] else values.astype(np.int64)
+			else:
+				columns[name] = [self._scalars[name][row] for row in rows]
+
+		return pd.DataFrame(columns)
+
+	def write_parquet(self, output_filename):
+		"""
+		The function `write_parquet` writes the table in Parquet format (requires `pyarrow` or `fastparquet`).
+
+		:param output_filename: path to the output file
+		"""
+		self.to_dataframe().to_parquet(output_filename, index=False)
+
+
 def print_full_statistics(list_of_transcripts, output_filename):
 	"""
 	The function processes a list of transcripts to calculate statistics and outputs them to a
-	specified file in tab-separated format.
+	specified file in tab-separated format (see `CorpusStatistics`).
 
 	:param list_of_transcripts: `list_of_transcripts` is a dictionary where the keys are transcript IDs
-	and the values are objects representing transcripts. Each transcript object has a method
-	`get_stats()` that calculates statistics for that transcript and stores them in a DataFrame
-	attribute called `statistics`
+	and the values are objects representing transcripts
 	:param output_filename: The `output_filename` parameter in the `print_full_statistics` function is a
 	string that represents the name of the file where the statistics for each transcript will be saved.
-	This file will be in CSV format and will contain the calculated statistics for each transcript in a
-	structured manner.
 	"""
 
-	max_columns = 0
-	full_statistics = [] # list that contains all transcripts
-	for _, transcript in list_of_transcripts.items(): # iterating each transcript
-		transcript.get_stats() # calculating statistics
-		stats_dict = transcript.statistics.set_index("Statistic")["Value"].to_dict() # converting statistics into a dictionary
-		if len(stats_dict["num_tu"]) > max_columns:
-			max_columns = len(stats_dict["num_tu"])
-		full_statistics.append(stats_dict)
+	corpus_statistics = CorpusStatistics(capacity=max(len(list_of_transcripts), 1))
+	for _, transcript in list_of_transcripts.items():
+		corpus_statistics.add_transcript(transcript)
+	corpus_statistics.write_tsv(output_filename)
 
-	for stats in full_statistics:
-		fields = list(stats.keys())
-		for field in fields:
-			if type(stats[field]) is list:
-				for el in range(max_columns):
-					stats[f"{field}::{el}"] = stats[field][el] if len(stats[field])>el else 0
-				del stats[field]
 
-	# Creating a df with all statistics
-	statistics_complete = pd.DataFrame(full_statistics) # creating the dataframe
-	statistics_complete.to_csv(output_filename, index=False, sep="\t") # converting the df to csv
+def print_time_series(list_of_transcripts, output_filename, window_size, by_speaker=False, cumulative=False, sep="\t"):
+	"""
+	The function `print_time_series` writes the statistics of each transcript over consecutive time windows
+	as a wide table: one row per transcript and window (and speaker, if required), one column per statistic.
+	Statistics are computed from the cumulative totals stored in transcripts (see `Transcript.get_time_series`),
+	so any window size can be used without processing transcripts again.
+
+	:param list_of_transcripts: dictionary mapping transcript IDs to transcripts
+	:param output_filename: path to the output file
+	:param window_size: duration of windows, in seconds
+	:param by_speaker: whether statistics are computed separately for each speaker
+	:param cumulative: whether each window also includes all the previous units
+	:param sep: separator of the output file
+	"""
+	with open(output_filename, "w", encoding="utf-8", newline="") as fout:
+		writer = csv.writer(fout, delimiter=sep, lineterminator="\n")
+		header = False
+
+		for transcript_id, transcript in list_of_transcripts.items():
+			time_series = transcript.get_time_series()
+			if not header:
+				writer.writerow(["Transcript_ID", "Speaker", "window_start", "window_end", *time_series.statistics])
+				header = True
+
+			edges = time_series.window_edges(window_size).tolist()
+			for speaker in (time_series.speakers if by_speaker else [None]):
+				series = time_series.windows(window_size, speakers=None if speaker is None else [speaker],
+											cumulative=cumulative)
+				columns = [series[name] for name in time_series.statistics]
+				for window_id, values in enumerate(zip(*columns)):
+					writer.writerow([transcript_id, "_" if speaker is None else speaker,
+									edges[window_id], edges[window_id+1], *values])
+
+
+@functools.lru_cache(maxsize=JEFFERSON_CACHE_SIZE)
+def jefferson_feats(intonation_pattern, interruption, truncation, prosodiclink, spaceafter,
+					non_ita, iso_code, non_ortho, volume):
+	"""
+	The function `jefferson_feats` builds the `jefferson_feats` column of the CoNLL output for a combination of
+	token features. Tokens share a small number of combinations, so strings are cached.
+
+	:return: features separated by "|", or "_" if there are none
+	"""
+	feats = []
+	if intonation_pattern != df.intonation.plain:
+		feats.append(f"Intonation={intonation_pattern.name}")
+	if interruption:
+		feats.append("Interrupted=Yes")
+	if truncation:
+		feats.append("Truncated=Yes")
+	if prosodiclink:
+		feats.append("ProsodicLink=Yes")
+	if not spaceafter:
+		feats.append("SpaceAfter=No")
+	if non_ita:
+		feats.append(f"Language={iso_code}")
+	if non_ortho:
+		feats.append("Orthography=Yes")
+	if volume:
+		feats.append(f"Volume={volume.name}")
+
+	return "|".join(feats) if len(feats) else "_"
+
+
+def _format_spans(spans):
+	return ",".join(f"{span[0]}-{span[1]}({span_id})" for span_id, span in spans.items())
+
+
+def _conll_rows(tu):
+	"""Rows of the CoNLL output for the tokens of `tu`, as lists of values in the order of `CONLL_FIELDNAMES`"""
+	variation = tu.non_ita.name
+	begin = f"Begin={tu.start}"
+	end = f"End={tu.end}"
+
+	for tok in tu.tokens.values():
+		if df.position.start in tok.position_in_tu:
+			align = f"{begin}|{end}" if df.position.end in tok.position_in_tu else begin
+		else:
+			align = end if df.position.end in tok.position_in_tu else "_"
+
+		prolongations = ",".join(f"{x}x{y}" for x, y in tok.prolongations.items()) if tok.prolongations else "_"
+
+		pace = "_"
+		if tok.slow_pace or tok.fast_pace:
+			pace = "|".join(([f"Slow={_format_spans(tok.slow_pace)}"] if tok.slow_pace else []) +
+							([f"Fast={_format_spans(tok.fast_pace)}"] if tok.fast_pace else []))
+
+		yield [tok.id, tu.speaker, tu.tu_id, tu.tu_id, "_", tu.annotation[tok.span[0]:tok.span[1]],
+				tok.text, "_", "_", "_", "_", "_",
+				tok.token_type.name, "_", variation,
+				jefferson_feats(tok.intonation_pattern, tok.interruption, tok.truncation, tok.prosodiclink,
+								tok.spaceafter, tok.non_ita, tok.iso_code, tok.non_ortho, tok.volume),
+				align, prolongations, pace,
+				_format_spans(tok.guesses) if tok.guesses else "_",
+				_format_spans(tok.overlaps) if tok.overlaps else "_"]
+
+
+# token features reported in the linear output and in the summary
+_SUMMARY_FEATURES = {"ling": df.tokentype.linguistic,
+					"unk": df.tokentype.unknown,
+					"anonym": df.tokentype.anonymized,
+					"pause": df.tokentype.shortpause,
+					"nvb": df.tokentype.nonverbalbehavior,
+					"err": df.tokentype.error,
+					"rising": df.intonation.rising,
+					"weaklyrising": df.intonation.weakly_rising,
+					"falling": df.intonation.falling}
+
+
+# token counts in the summary, in order ("meta" counts units)
+_JSON_TOKEN_KEYS = ["ling", "unk", "anonym", "meta", "pause", "err", "rising", "weaklyrising", "falling"]
+
+
+def _tokens_per_tu(transcript):
+	"""Number of tokens of each type (or intonation pattern) in each transcription unit, in transcript order"""
+	summary = transcript.get_summary()
+	return {key: summary.per_tu(feature).tolist() for key, feature in _SUMMARY_FEATURES.items()}
+
+
+def _linear_row(tu, position, tokens_per_tu):
+	"""Row of the linear output for `tu`, as a list of values in the order of `LINEAR_FIELDNAMES`"""
+	text = tu.annotation.replace("{P}", "(.)").replace("{", "((").replace("}", "))")
+	if df.languagevariation.some in tu.non_ita:
+		text = "# "+text
+	if df.languagevariation.all in tu.non_ita:
+		text = "#_ "+text
+
+	errors = f"{tokens_per_tu['err'][position]}"
+	if tokens_per_tu["err"][position] > 0:
+		error_forms = " ".join([tok.text for tok in tu.tokens.values() if df.tokentype.error in tok.token_type])
+		if len(error_forms):
+			errors += f", {error_forms}"
+
+	overlap_duration = "_"
+	if len(tu.overlap_duration) > 0:
+		overlap_duration = ",".join(f"{unit_id}={duration:.3f}" for unit_id, duration in tu.overlap_duration.items())
+
+	return [tu.tu_id, tu.speaker, tu.start, tu.end, tu.duration, tu.include,
+			tu.non_ita.name if df.languagevariation.some in tu.non_ita or df.languagevariation.all in tu.non_ita else "_",
+			tu.warnings.get("UNEVEN_SPACES", 0),
+			tu.warnings.get("NUMBERS", 0),
+			tu.warnings.get("ACCENTS", 0),
+			tu.warnings.get("NON_JEFFERSON", 0),
+			tu.warnings.get("TRIM_PAUSES", 0),
+			tu.warnings.get("TRIM_PROSODICLINKS", 0),
+			tu.warnings.get("MOVED_BOUNDARIES", 0),
+			tu.warnings.get("SWITCHES", 0),
+			tu.warnings.get("MISMATCHING_OVERLAPS", 0),
+			tu.errors.get("UNBALANCED_DOTS", False),
+			tu.errors.get("UNBALANCED_PACE", False),
+			tu.errors.get("UNBALANCED_GUESS", False),
+			tu.errors.get("UNBALANCED_OVERLAP", False),
+			tu.errors.get("MISMATCHING_OVERLAPS", False),
+			tu.errors.get("OVERLAPS:MISSING_ANNOTATION", False),
+			tu.errors.get("OVERLAPS:MISSING_TIME", False),
+			overlap_duration,
+			tokens_per_tu["pause"][position],
+			tokens_per_tu["nvb"][position],
+			errors,
+			tokens_per_tu["ling"][position],
+			tu.orig_annotation,
+			text,
+			" ".join(str(tok) for tok in tu.tokens.values()).replace("{P}", "(.)").replace("{", "((").replace("}", "))")]
 
 
 def conversation_to_conll(transcript, output_filename, sep = '\t'):
@@ -189,156 +496,54 @@ def conversation_to_conll(transcript, output_filename, sep = '\t'):
 	"""
 
 	with open(output_filename, "w", encoding="utf-8", newline='') as fout:
-		writer = csv.DictWriter(fout, fieldnames=CONLL_FIELDNAMES, delimiter=sep, restval="_")
-		writer.writeheader()
+		writer = csv.writer(fout, delimiter=sep)
+		writer.writerow(CONLL_FIELDNAMES)
 
 		for tu in transcript.transcription_units:
-			tu_id = tu.tu_id
-			# print(tu.orig_annotation)
-			# print(tu.non_ita)
-			# input()
-
-			for _, tok in tu.tokens.items():
-
-				to_write = {"token_id": tok.id,
-							"speaker": tu.speaker,
-							"tu_id": tu_id,
-							"unit": tu_id,
-							"form": tok.text,
-							"type": tok.token_type.name,
-							"variation": tu.non_ita.name,
-							}
-
-				jefferson_feats = {"intonation": f"Intonation={tok.intonation_pattern.name}" if tok.intonation_pattern != df.intonation.plain else "_",
-									"interruption": "Interrupted=Yes" if tok.interruption else "_",
-									"truncation": "Truncated=Yes" if tok.truncation else "_",
-									"prosodicLink": "ProsodicLink=Yes" if tok.prosodiclink else "_",
-									"spaceafter": "SpaceAfter=No" if not tok.spaceafter else "_",
-									"non_ita": f"Language={tok.iso_code}" if tok.non_ita else "_",
-									"non_ortho": "Orthography=Yes" if tok.non_ortho else "_",
-									"volume": f"Volume={tok.volume.name}" if tok.volume else "_"}
-
-				to_write["jefferson_feats"] = "|".join([x for x in jefferson_feats.values() if not x == "_"]) #TODO: rewrite
-				if to_write["jefferson_feats"] == "":
-					to_write["jefferson_feats"] = "_"
-
-				to_write["span"] = tu.annotation[tok.span[0]:tok.span[1]]
-
-				align = []
-				if df.position.start in tok.position_in_tu:
-					align.append(("Begin", tu.start))
-				if df.position.end in tok.position_in_tu:
-					align.append(("End", tu.end))
-				if len(align):
-					to_write["align"] = "|".join([f"{x[0]}={x[1]}" for x in align])
-
-				#TODO rewrite
-				to_write["prolongations"] = ",".join([f"{x[0]}x{x[1]}" for x in tok.prolongations.items()])
-				if to_write["prolongations"] == "":
-					to_write["prolongations"] = "_"
-
-				slow_pace = []
-				for span_id, span in tok.slow_pace.items():
-					slow_pace.append(f"{span[0]}-{span[1]}({span_id})")
-
-				fast_pace = []
-				for span_id, span in tok.fast_pace.items():
-					fast_pace.append(f"{span[0]}-{span[1]}({span_id})")
-
-				if len(slow_pace) or len(fast_pace):
-					to_write["pace"] = ""
-					if len(slow_pace):
-						to_write["pace"] = "Slow="+",".join(slow_pace)
-					if len(fast_pace):
-						if len(to_write["pace"]):
-							to_write["pace"] += "|"
-						to_write["pace"] += "Fast="+",".join(fast_pace)
-
-					# to_write["pace"] = ",".join(slow_pace) if len(slow_pace) > 0 else "_"
-
-				guesses = []
-				for span_id, span in tok.guesses.items():
-					guesses.append(f"{span[0]}-{span[1]}({span_id})")
-				if len(guesses):
-					to_write["guesses"] = ",".join(guesses) if len(guesses) > 0 else "_"
-
-				overlaps = []
-				for span_id, span in tok.overlaps.items():
-					overlaps.append(f"{span[0]}-{span[1]}({span_id})")
-				if len(overlaps):
-					to_write["overlaps"] = ",".join(overlaps) if len(overlaps) > 0 else "_"
-
-				writer.writerow(to_write)
+			writer.writerows(_conll_rows(tu))
 
 
 def conversation_to_linear(transcript, output_filename, sep = '\t'):
 
-	fieldnames = ["tu_id", "speaker", "start", "end", "duration", "include", "variation",
-				"W:normalized_spaces", "W:numbers", "W:accents", "W:non_jefferson", "W:pauses_trim", "W:prosodic_trim", "W:moved_boundaries", "W:switches", "W:overlap_mismatch",
-				"E:volume", "E:pace", "E:guess", "E:overlap", "E:overlap_mismatch", "E:overlap_annotation", "E:overlap_time",
-				"E:overlap_duration",
-				"T:shortpauses", "T:nonverbalbehavior", "T:errors", "T:linguistic",
-				"original", "text", "orthographic"]
-
 	with open(output_filename, "w", encoding="utf-8") as fout:
-		writer = csv.DictWriter(fout, fieldnames=fieldnames, delimiter=sep, restval="_")
-		writer.writeheader()
+		writer = csv.writer(fout, delimiter=sep)
+		writer.writerow(LINEAR_FIELDNAMES)
 
-		for tu in transcript.transcription_units:
-			if not tu.include:
-				continue
-			to_write = {
-						"tu_id": tu.tu_id,
-						"speaker": tu.speaker,
-						"start": tu.start,
-						"end": tu.end,
-						"duration": tu.duration,
-						"include": tu.include,
-						"variation": tu.non_ita.name if df.languagevariation.some in tu.non_ita or df.languagevariation.all in tu.non_ita else "_",
-						"original": tu.orig_annotation,
-						"text": tu.annotation.replace("{P}", "(.)").replace("{", "((").replace("}", "))"),
-						"orthographic": " ".join(str(tok) for _, tok in tu.tokens.items()).replace("{P}", "(.)").replace("{", "((").replace("}", "))"),
-						"W:normalized_spaces": tu.warnings["UNEVEN_SPACES"],
-						"W:numbers": tu.warnings["NUMBERS"],
-						"W:accents": tu.warnings["ACCENTS"],
-						"W:non_jefferson": tu.warnings["NON_JEFFERSON"],
-						"W:pauses_trim": tu.warnings["TRIM_PAUSES"],
-						"W:prosodic_trim": tu.warnings["TRIM_PROSODICLINKS"],
-						"W:moved_boundaries": tu.warnings["MOVED_BOUNDARIES"],
-						"W:switches": tu.warnings["SWITCHES"],
-						"W:overlap_mismatch": tu.warnings["MISMATCHING_OVERLAPS"],
-						"E:volume": tu.errors["UNBALANCED_DOTS"],
-						"E:pace": tu.errors["UNBALANCED_PACE"],
-						"E:guess": tu.errors["UNBALANCED_GUESS"],
-						"E:overlap": tu.errors["UNBALANCED_OVERLAP"],
-						"E:overlap_mismatch": tu.errors["MISMATCHING_OVERLAPS"],
-						"E:overlap_annotation": tu.errors["OVERLAPS:MISSING_ANNOTATION"],
-						"E:overlap_time": tu.errors["OVERLAPS:MISSING_TIME"],
-						# "E:unmatched_overlaps": tu.errors["UNMATCHED_OVERLAPS"],
-						"T:shortpauses": sum([df.tokentype.shortpause in tok.token_type for _, tok in tu.tokens.items()]),
-						"T:nonverbalbehavior": sum([df.tokentype.nonverbalbehavior in tok.token_type for _, tok in tu.tokens.items()]),
-						"T:errors": sum([df.tokentype.error in tok.token_type for _, tok in tu.tokens.items()]),
-						"T:linguistic": sum([df.tokentype.linguistic in tok.token_type for _, tok in tu.tokens.items()])
-					}
+		tokens_per_tu = _tokens_per_tu(transcript)
+		for position, tu in enumerate(transcript.transcription_units):
+			if tu.include:
+				writer.writerow(_linear_row(tu, position, tokens_per_tu))
 
-			if df.languagevariation.some in tu.non_ita:
-				to_write["text"] = "# "+to_write["text"]
 
-			if df.languagevariation.all in tu.non_ita:
-				to_write["text"] = "#_ "+to_write["text"]
+def write_transcript(transcript, conll_filename, linear_filename, sep = '\t'):
+	"""
+	The function `write_transcript` writes the CoNLL and linear outputs of a transcript and builds its summary
+	with a single traversal of the transcription units. Outputs are the same as those of
+	`conversation_to_conll`, `conversation_to_linear` and `build_json`.
+
+	:param transcript: processed transcript
+	:param conll_filename: path to the CoNLL output
+	:param linear_filename: path to the linear output
+	:param sep: delimiter that separates the fields in the output files
+	:return: summary of the transcript (see `build_json`)
+	"""
+	tokens_per_tu = _tokens_per_tu(transcript)
+	unit_totals = _UnitTotals()
 
-			errors = " ".join([tok.text for _, tok in tu.tokens.items() if df.tokentype.error in tok.token_type])
-			to_write["T:errors"] = f"{to_write['T:errors']}"
-			if len(errors):
-				to_write["T:errors"]+=f", {errors}"
-			if len(tu.overlap_duration) > 0:
-				overlaps = []
-				for unit_id, duration in tu.overlap_duration.items():
-					overlaps.append(f"{unit_id}={duration:.3f}")
+	with open(conll_filename, "w", encoding="utf-8", newline='') as conll_out, \
+		open(linear_filename, "w", encoding="utf-8") as linear_out:
+		conll_writer = csv.writer(conll_out, delimiter=sep)
+		conll_writer.writerow(CONLL_FIELDNAMES)
+		linear_writer = csv.writer(linear_out, delimiter=sep)
+		linear_writer.writerow(LINEAR_FIELDNAMES)
 
-				to_write["E:overlap_duration"] = ",".join(overlaps)
+		for position, tu in enumerate(transcript.transcription_units):
+			conll_writer.writerows(_conll_rows(tu))
+			if tu.include:
+				linear_writer.writerow(_linear_row(tu, position, tokens_per_tu))
+			unit_totals.add(tu)
 
-			writer.writerow(to_write)
+	return build_json(transcript, unit_totals)
 
 
 def csv2eaf(input_filename, linked_file, output_filename,
@@ -361,6 +566,8 @@ def csv2eaf(input_filename, linked_file, output_filename,
 				tiers.add(row["speaker"])
 				tus.append(row)
 
+	from pympi import Elan as EL
+
 	doc = EL.Eaf(author="automatic_pipeline")
 
 	doc.add_linked_file(linked_file, relpath=linked_file)
@@ -390,6 +597,71 @@ def csv2eaf(input_filename, linked_file, output_filename,
 	doc.to_file(output_filename)
 
 
+def read_eaf(input_filename):
+	"""
+	The function `read_eaf` reads the annotations of an ELAN (.eaf) file with a streaming parser, tier by tier
+	in the order of the file. Time slots are resolved to integer milliseconds (None when not aligned),
+	reference annotations take the times of the annotation they refer to.
+
+	:param input_filename: path to the eaf file
+	:return: generator of (tier, start, end, value) tuples
+	"""
+	time_slots = {}
+	# times of annotations, which may be referred to by annotations of other tiers
+	times = {}
+	# annotations waiting for the annotation they refer to, by ID of the latter
+	waiting = collections.defaultdict(list)
+	# annotations are yielded in order, so those following a waiting annotation are kept as well
+	queue = collections.deque()
+	tier = None
+
+	for event, elem in ElementTree.iterparse(input_filename, events=("start", "end")):
+		tag = elem.tag
+		if event == "start":
+			if tag == "TIER":
+				tier = elem.get("TIER_ID")
+
+		elif tag == "ALIGNABLE_ANNOTATION" or tag == "REF_ANNOTATION":
+			value_node = elem.find("ANNOTATION_VALUE")
+			if value_node is None:
+				raise ValueError(f"{tag} node must contain an ANNOTATION_VALUE node")
+			entry = [tier, None, None, value_node.text or "", False]
+			queue.append(entry)
+
+			if tag == "ALIGNABLE_ANNOTATION":
+				ts_ref1, ts_ref2 = elem.get("TIME_SLOT_REF1"), elem.get("TIME_SLOT_REF2")
+				if ts_ref1 not in time_slots or ts_ref2 not in time_slots:
+					raise ValueError(f"Time slot ID not found ({ts_ref1 if ts_ref1 not in time_slots else ts_ref2})")
+				resolved = [(elem.get("ANNOTATION_ID"), entry, (time_slots[ts_ref1], time_slots[ts_ref2]))]
+			elif elem.get("ANNOTATION_REF") in times:
+				resolved = [(elem.get("ANNOTATION_ID"), entry, times[elem.get("ANNOTATION_REF")])]
+			else:
+				resolved = []
+				entry[4] = True
+				waiting[elem.get("ANNOTATION_REF")].append((elem.get("ANNOTATION_ID"), entry))
+
+			while len(resolved) > 0:
+				ann_id, ann_entry, ann_times = resolved.pop()
+				ann_entry[1], ann_entry[2] = ann_times
+				ann_entry[4] = False
+				times[ann_id] = ann_times
+				if ann_id in waiting:
+					resolved.extend((x, y, ann_times) for x, y in waiting.pop(ann_id))
+
+			while len(queue) > 0 and not queue[0][4]:
+				yield tuple(queue.popleft()[:4])
+
+		elif tag == "TIME_SLOT":
+			time_value = elem.get("TIME_VALUE")
+			time_slots[elem.get("TIME_SLOT_ID")] = int(time_value) if time_value else None
+
+		elif tag == "ANNOTATION" or tag == "TIER":
+			elem.clear()
+
+	if len(waiting) > 0:
+		raise ValueError(f"Missing annotation ID ({next(iter(waiting))}) -- Corrupted ELAN file")
+
+
 def eaf2csv(input_filename, output_filename, annotations, sep="\t"):
 	"""
 	Reads data from an ELAN (.eaf) file and writes it to a CSV file with specified fieldnames and separator.
@@ -404,30 +676,27 @@ def eaf2csv(input_filename, output_filename, annotations, sep="\t"):
 
 	full_file = []
 
-	eaf = elan.read_eaf(input_filename)
-	for tier in eaf:
-		for anno in tier.annotations:
-			_from_ts = f"{anno.from_ts.sec:.3f}" if anno.from_ts is not None else ''
-			_to_ts = f"{anno.to_ts.sec:.3f}" if anno.to_ts is not None else ''
-			_duration = f"{anno.duration:.3f}" if anno.duration is not None else ''
-
-			to_write = {"speaker": tier.ID,
-						"start": _from_ts,
-						"end": _to_ts,
-						"duration": _duration,
-						"id": None
-						# "text": re.sub(r"^id:[0-9]+", "", anno.value.strip()) # TODO: substitute {} with (())
-						}
-			text_matches = re.split(r"^(id:)([0-9]+) ", anno.value.strip())
-
-			to_write["text"] = text_matches[-1]
-			if len(text_matches)>1:
-				to_write["id"] = text_matches[2] # due to crazy python: re.split(r"^(id:)([0-9]+) ", "id:15 ciao ciao") ->  ['', 'id:', '15', 'ciao ciao']
-			full_file.append(to_write)
+	for tier, start, end, value in read_eaf(input_filename):
+		if start is None:
+			raise ValueError(f"Annotation '{value}' of tier {tier} is not aligned to time")
+
+		to_write = {"speaker": tier,
+					"start": start,
+					"end": end,
+					"id": None
+					# "text": re.sub(r"^id:[0-9]+", "", anno.value.strip()) # TODO: substitute {} with (())
+					}
+		text_matches = re.split(r"^(id:)([0-9]+) ", value.strip())
+
+		to_write["text"] = text_matches[-1]
+		if len(text_matches)>1:
+			to_write["id"] = text_matches[2] # due to crazy python: re.split(r"^(id:)([0-9]+) ", "id:15 ciao ciao") ->  ['', 'id:', '15', 'ciao ciao']
+		full_file.append(to_write)
 
 	to_remap = {}
 
-	full_file = sorted(full_file, key=lambda x: float(x["start"]))
+	# times are sorted as milliseconds, and only formatted (in seconds) when written
+	full_file.sort(key=lambda x: x["start"])
 
 	with open(output_filename, "w", encoding="utf-8", newline='') as fout:
 		writer = csv.DictWriter(fout, fieldnames=fieldnames, delimiter=sep, extrasaction='ignore')
@@ -436,6 +705,11 @@ def eaf2csv(input_filename, output_filename, annotations, sep="\t"):
 			to_write["tu_id"] = el_no
 			to_remap[to_write["id"]] = el_no
 
+			start, end = to_write["start"], to_write["end"]
+			to_write["start"] = f"{start/1000:.3f}"
+			to_write["end"] = f"{end/1000:.3f}" if end is not None else ''
+			to_write["duration"] = f"{(end - start)/1000:.3f}" if end is not None else ''
+
 			writer.writerow(to_write)
 
 	if "ignore" in annotations:
@@ -545,74 +819,264 @@ def load_annotations(fname):
 	return ret
 
 
-def build_json(transcript):
-	ret = {}
+def load_manifest(fname):
+	"""
+	The function `load_manifest` reads the build manifest written by `dump_manifest`.
 
-	ret["transcript"] = transcript.tr_id
-	ret["speakers"] = {x: collections.defaultdict(int) for x in transcript.speakers}
-	ret["spoken time"] = 0
-	ret["tot tokens"] = 0
-	ret["tot tokens-ling"] = 0
-	ret["tot tokens-unk"] = 0
-	ret["tot tokens-anonym"] = 0
-	ret["tot tokens-meta"] = 0
-	ret["tot tokens-pause"] = 0
-	ret["tot tokens-err"] = 0
-	ret["tot tokens-rising"] = 0
-	ret["tot tokens-weaklyrising"] = 0
-	ret["tot tokens-falling"] = 0
-	ret["tot code switching units"] = 0
-
-	for unit in transcript:
-		ret["speakers"][unit.speaker]["TUs"] += 1
-		ret["speakers"][unit.speaker]["time"] += unit.duration
-		ret["speakers"][unit.speaker]["tokens-ling"] += len([x for x in unit.tokens.values() if df.tokentype.linguistic in x.token_type])
-		ret["speakers"][unit.speaker]["tokens-unk"] += len([x for x in unit.tokens.values() if df.tokentype.unknown in x.token_type])
-		ret["speakers"][unit.speaker]["tokens-anonym"] += len([x for x in unit.tokens.values() if df.tokentype.anonymized in x.token_type])
-		ret["speakers"][unit.speaker]["tokens-meta"] += len([[x for x in unit.tokens.values() if df.tokentype.nonverbalbehavior in x.token_type]])
-		ret["speakers"][unit.speaker]["tokens-pause"] += len([x for x in unit.tokens.values() if df.tokentype.shortpause in x.token_type])
-		ret["speakers"][unit.speaker]["tokens-err"] += len([x for x in unit.tokens.values() if df.tokentype.error in x.token_type])
-		ret["speakers"][unit.speaker]["tokens-rising"] += len([x for x in unit.tokens.values() if df.intonation.rising in x.intonation_pattern])
-		ret["speakers"][unit.speaker]["tokens-weaklyrising"] += len([x for x in unit.tokens.values() if df.intonation.weakly_rising in x.intonation_pattern])
-		ret["speakers"][unit.speaker]["tokens-falling"] += len([x for x in unit.tokens.values() if df.intonation.falling in x.intonation_pattern])
-		ret["speakers"][unit.speaker]["code-switching units"] += 1 if unit.non_ita else 0
-
-		ret["spoken time"] += unit.duration
-		ret["tot tokens"] += len(unit.tokens)
-		ret["tot tokens-ling"] += len([x for x in unit.tokens.values() if df.tokentype.linguistic in x.token_type])
-		ret["tot tokens-unk"] += len([x for x in unit.tokens.values() if df.tokentype.unknown in x.token_type])
-		ret["tot tokens-anonym"] += len([x for x in unit.tokens.values() if df.tokentype.anonymized in x.token_type])
-		ret["tot tokens-meta"] += len([[x for x in unit.tokens.values() if df.tokentype.nonverbalbehavior in x.token_type]])
-		ret["tot tokens-pause"] += len([x for x in unit.tokens.values() if df.tokentype.shortpause in x.token_type])
-		ret["tot tokens-err"] += len([x for x in unit.tokens.values() if df.tokentype.error in x.token_type])
-		ret["tot tokens-rising"] += len([x for x in unit.tokens.values() if df.intonation.rising in x.intonation_pattern])
-		ret["tot tokens-weaklyrising"] += len([x for x in unit.tokens.values() if df.intonation.weakly_rising in x.intonation_pattern])
-		ret["tot tokens-falling"] += len([x for x in unit.tokens.values() if df.intonation.falling in x.intonation_pattern])
-		ret["tot code switching units"] = 1 if unit.non_ita else 0
+	:param fname: path to the manifest
+	:return: dictionary mapping transcript names to the fingerprint of their inputs (see
+	`main.input_fingerprint`), empty if the manifest is missing or cannot be read
+	"""
+	try:
+		with open(fname, encoding="utf-8") as fin:
+			manifest = json.load(fin)
+	except FileNotFoundError:
+		return {}
+	except ValueError:
+		logger.warning("Ignoring unreadable build manifest %s", fname)
+		return {}
+
+	return manifest.get("transcripts", {})
+
+
+def dump_manifest(fingerprints, fname):
+	"""
+	The function `dump_manifest` writes the build manifest of an output directory. The file is replaced
+	only once completely written, so that an interrupted run never leaves a partial manifest.
+
+	:param fingerprints: dictionary mapping transcript names to the fingerprint of their inputs
+	:param fname: path to the manifest
+	"""
+	tmp_fname = f"{fname}.tmp"
+	with open(tmp_fname, "w", encoding="utf-8") as fout:
+		json.dump({"transcripts": fingerprints}, fout, indent=2, ensure_ascii=False)
+		fout.write("\n")
+	os.replace(tmp_fname, fname)
+
+
+def _transcript_cache_header():
+	return {"format": "kiparla-tools transcript",
+			"version": TRANSCRIPT_CACHE_VERSION,
+			"model": data.model_signature(),
+			"tool": utils.TOOL_VERSION}
+
+
+def save_transcript(transcript, output_filename, fingerprint=None):
+	"""
+	The function `save_transcript` saves a processed transcript (units, tokens, overlaps) to a binary file,
+	that can be restored by `load_transcript` without processing the transcript again.
+	The file starts with a one-line JSON header describing the versions of the data model and of the toolkit
+	and the inputs of the transcript, followed by the compressed pickle of the transcript.
+
+	:param transcript: processed transcript
+	:param output_filename: path to the file, usually ending with `TRANSCRIPT_CACHE_SUFFIX`
+	:param fingerprint: inputs the transcript was processed from (see `main.input_fingerprint`)
+	"""
+	header = dict(_transcript_cache_header(), input=fingerprint)
+	tmp_fname = f"{output_filename}.tmp"
+	with open(tmp_fname, "wb") as fout:
+		fout.write(json.dumps(header).encode("utf-8") + b"\n")
+		fout.write(zlib.compress(pickle.dumps(transcript, protocol=pickle.HIGHEST_PROTOCOL), 1))
+	os.replace(tmp_fname, output_filename)
+
+
+def _transcript_cache_matches(header, fingerprint):
+	if not isinstance(header, dict):
+		return False
+	header = dict(header)
+	saved_fingerprint = header.pop("input", None)
+	return header == _transcript_cache_header() and (fingerprint is None or saved_fingerprint == fingerprint)
+
+
+def transcript_cache_is_current(input_filename, fingerprint=None):
+	"""
+	The function `transcript_cache_is_current` checks, by reading its header only, whether a file written
+	by `save_transcript` can be restored by the current version of the toolkit.
+
+	:param input_filename: path to the file
+	:param fingerprint: if given, the inputs (see `main.input_fingerprint`) the transcript must have been processed from
+	:return: True if the file exists and is up to date
+	"""
+	try:
+		with open(input_filename, "rb") as fin:
+			return _transcript_cache_matches(json.loads(fin.readline()), fingerprint)
+	except (OSError, ValueError):
+		return False
+
+
+def load_transcript(input_filename, fingerprint=None):
+	"""
+	The function `load_transcript` restores a transcript saved by `save_transcript`.
+	Files are unpickled: only load files written by the toolkit.
+
+	:param input_filename: path to the file
+	:param fingerprint: if given, the inputs (see `main.input_fingerprint`) the transcript must have been processed from
+	:return: the transcript, or None if the file was written by another version of the data model or of the toolkit,
+		or from other inputs
+	"""
+	with open(input_filename, "rb") as fin:
+		try:
+			header = json.loads(fin.readline())
+		except ValueError:
+			header = None
+
+		if not _transcript_cache_matches(header, fingerprint):
+			logger.info("Ignoring outdated transcript cache %s", input_filename)
+			return None
+
+		return pickle.loads(zlib.decompress(fin.read()))
+
+
+class SummaryWriter:
+	"""
+	Writes the summaries of transcripts (see `build_json`) to a JSON array one at a time, flushing each
+	of them as soon as it is written. The file is the same as the one written by
+	`json.dumps(summaries, indent=2)` once the writer is closed.
+
+	Summaries can be given with their position in the list: they are then kept until all the previous
+	ones have been written (a position with summary None is skipped).
+	"""
+
+	def __init__(self, output_filename):
+		self.file = open(output_filename, "w", encoding="utf-8")
+		self.written = 0
+		self.next_position = 0
+		self.pending = {}
+
+	def write(self, summary, position=None):
+		if position is None:
+			self._write(summary)
+			return
+
+		self.pending[position] = summary
+		while self.next_position in self.pending:
+			summary = self.pending.pop(self.next_position)
+			self.next_position += 1
+			if summary is not None:
+				self._write(summary)
+
+	def _write(self, summary):
+		# newlines only appear between JSON tokens, strings have them escaped
+		text = json.dumps(summary, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+		self.file.write(("[\n  " if self.written == 0 else ",\n  ") + text)
+		self.file.flush()
+		self.written += 1
 
+	def close(self):
+		self.file.write("[]\n" if self.written == 0 else "\n]\n")
+		self.file.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+
+def read_summaries(input_filename, chunk_size=2**16):
+	"""
+	The function `read_summaries` lazily reads the summaries written by `SummaryWriter`, without loading
+	the whole file. Any file containing a JSON array of objects, or one object per line, can be read.
+
+	:param input_filename: path to the summary file
+	:param chunk_size: number of characters read at a time
+	:return: generator of summaries, in the order of the file
+	"""
+	decoder = json.JSONDecoder()
+	buffer = ""
+
+	with open(input_filename, encoding="utf-8") as fin:
+		while True:
+			# skip what separates objects: brackets of the array, commas and whitespace
+			buffer = buffer.lstrip("[], \t\r\n")
+			try:
+				summary, end = decoder.raw_decode(buffer)
+			except json.JSONDecodeError:
+				# the next object is incomplete
+				chunk = fin.read(chunk_size)
+				if len(chunk) == 0:
+					if buffer:
+						raise
+					return
+				buffer += chunk
+				continue
+
+			yield summary
+			buffer = buffer[end:]
+
+
+class _UnitTotals:
+	"""Totals over the transcription units that `build_json` needs, collected while units are traversed"""
+
+	def __init__(self):
+		self.units = collections.Counter()
+		self.time = collections.defaultdict(int)
+		self.code_switching = collections.Counter()
+		self.spoken_time = 0
+		self.included = 0
+		self.last_non_ita = False
+
+	def add(self, unit):
+		self.units[unit.speaker] += 1
+		self.time[unit.speaker] += unit.duration
+		self.code_switching[unit.speaker] += 1 if unit.non_ita else 0
+		self.spoken_time += unit.duration
+		self.included += 1 if unit.include else 0
+		self.last_non_ita = bool(unit.non_ita)
+
+
+def build_json(transcript, unit_totals=None):
+	"""
+	The function `build_json` summarizes a transcript: time, number of units and of tokens of each type
+	(per speaker and overall), and number of warnings and errors. Counts of tokens, warnings and errors are
+	read from the summary of the transcript (see `summary.TranscriptSummary`).
+
+	:param transcript: processed transcript
+	:param unit_totals: totals over the units collected by the caller while traversing them (see `write_transcript`),
+		units are traversed here if None
+	:return: dictionary that can be serialized as JSON
+	"""
+	summary = transcript.get_summary()
+
+	if unit_totals is None:
+		unit_totals = _UnitTotals()
+		for unit in transcript:
+			unit_totals.add(unit)
+	units = unit_totals.units
+	time = unit_totals.time
+	code_switching = unit_totals.code_switching
+	spoken_time = unit_totals.spoken_time
+
+	per_speaker = {key: summary.per_speaker(feature) for key, feature in _SUMMARY_FEATURES.items()}
+
+	ret = {}
+	ret["transcript"] = transcript.tr_id
+	ret["speakers"] = {}
+	for speaker in transcript.speakers:
+		ret["speakers"][speaker] = {}
+		if units[speaker] == 0:
+			continue
+		ret["speakers"][speaker]["TUs"] = units[speaker]
+		ret["speakers"][speaker]["time"] = time[speaker]
+		for key in _JSON_TOKEN_KEYS:
+			# NOTE: tokens-meta has always counted units, not metalinguistic tokens
+			ret["speakers"][speaker][f"tokens-{key}"] = units[speaker] if key == "meta" else per_speaker[key][speaker]
+		ret["speakers"][speaker]["code-switching units"] = code_switching[speaker]
+
+	ret["spoken time"] = spoken_time
+	ret["tot tokens"] = int(summary.tokens.sum())
+	for key in _JSON_TOKEN_KEYS:
+		ret[f"tot tokens-{key}"] = len(transcript.transcription_units) if key == "meta" \
+			else int(summary.per_tu(_SUMMARY_FEATURES[key]).sum())
+	# NOTE: this has always reported the last unit only
+	ret["tot code switching units"] = 1 if unit_totals.last_non_ita else 0
 
 	ret["overlaps"] = len(transcript.overlap_events)
-	ret["TUs"] = sum(1 for x in transcript.transcription_units if x.include)
-	ret["removed TUs"] = sum(1 for x in transcript.transcription_units if not x.include)
-
-	ret["WARNINGS"] = {}
-	ret["ERRORS"] = {}
-	# ret["ERRORS SPECS"] = {}
-
-	for unit in transcript:
-		for key, value in unit.warnings.items():
-			if not key in ret["WARNINGS"]:
-				ret["WARNINGS"][key] = 0
-			ret["WARNINGS"][key] += value
-
-	for unit in transcript:
-		for key, value in unit.errors.items():
-			if not key in ret["ERRORS"]:
-				# ret["ERRORS SPECS"][key] = []
-				ret["ERRORS"][key] = 0
-			if value:
-				# ret["ERRORS SPECS"][key].append(unit.tu_id)
-				ret["ERRORS"][key] += 1
+	ret["TUs"] = unit_totals.included
+	ret["removed TUs"] = len(transcript.transcription_units) - unit_totals.included
+
+	ret["WARNINGS"] = summary.warnings_total()
+	ret["ERRORS"] = summary.errors_total()
 
 	return ret
 
@@ -0,0 +1,235 @@
+"""Token statistics of a transcript, counted once per transcript, and their cumulative totals over time"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+import kiparla_tools.columns as cols
+import kiparla_tools.dataflags as df
+
+_FLAG_BITS = [cols.TRUNCATION, cols.INTERRUPTION, cols.PROSODICLINK, cols.SPACEAFTER, cols.NON_ITA,
+			cols.NON_ORTHO, cols.PROLONGED, cols.SLOW_PACE, cols.FAST_PACE, cols.OVERLAPPING]
+
+# features counted for each token: members of the flags of tokens and bits of TokenColumns.flags
+FEATURES = [*df.tokentype, *df.intonation, *df.volume, *_FLAG_BITS]
+FEATURE_INDEX = {feature: position for position, feature in enumerate(FEATURES)}
+
+# annotated spans counted for each unit (attributes of TranscriptionUnit)
+SPAN_KINDS = ["low_volume_spans", "high_volume_spans", "slow_pace_spans", "fast_pace_spans",
+			"overlapping_spans", "guessing_spans"]
+
+
+def _label_matrix(maps, dtype):
+	"""
+	The function `_label_matrix` stacks dictionaries (e.g., warnings of units) into a matrix with one column
+	per key, in the order in which keys first appear. Dictionaries with the same keys are stacked together.
+
+	:param maps: list of dictionaries
+	:param dtype: type of the values of the matrix
+	:return: list of keys and matrix with one row per dictionary
+	"""
+	groups = {}
+	for position, values in enumerate(maps):
+		group = groups.setdefault(tuple(values), ([], []))
+		group[0].append(position)
+		group[1].append(tuple(values.values()))
+
+	# the first dictionary of each group is also the first one in which its new keys appear
+	labels = {}
+	for keys in groups:
+		for key in keys:
+			labels.setdefault(key, len(labels))
+
+	matrix = np.zeros((len(maps), len(labels)), dtype=dtype)
+	for keys, (positions, values) in groups.items():
+		if len(keys):
+			matrix[np.ix_(positions, [labels[key] for key in keys])] = values
+
+	return list(labels), matrix
+
+
+@dataclass
+class TranscriptSummary:
+	tokens: np.ndarray
+	counts: np.ndarray
+	speaker_counts: np.ndarray
+	warnings: np.ndarray
+	errors: np.ndarray
+	durations: np.ndarray
+	span_counts: np.ndarray
+	speakers: List[str] = field(default_factory=lambda: [])
+	warning_labels: List[str] = field(default_factory=lambda: [])
+	error_labels: List[str] = field(default_factory=lambda: [])
+
+	@classmethod
+	def from_transcript(cls, transcript):
+		"""
+		Counts, for each transcription unit of `transcript` and for each speaker, the tokens having each of
+		the `FEATURES`, as well as warnings and errors (in the order in which their labels first appear).
+		Tokens are counted with a single pass over the token columns. Durations and number of annotated
+		spans (see `SPAN_KINDS`) of units are stored as well.
+		"""
+		columns = transcript.get_token_columns()
+		n_units = len(columns.tu_start)
+
+		# one row per token, one column per feature
+		masks = np.concatenate([
+			(columns.token_type[:, None] & np.array([x.value for x in df.tokentype], dtype=np.uint8)) != 0,
+			(columns.intonation[:, None] & np.array([x.value for x in df.intonation], dtype=np.uint8)) != 0,
+			(columns.volume[:, None] & np.array([x.value for x in df.volume], dtype=np.uint8)) != 0,
+			(columns.flags[:, None] & np.array(_FLAG_BITS, dtype=np.uint16)) != 0], axis=1)
+		rows, features = np.nonzero(masks)
+		counts = np.bincount(columns.tu_index[rows] * len(FEATURES) + features,
+							minlength=n_units * len(FEATURES)).reshape(n_units, len(FEATURES))
+
+		speaker_counts = np.zeros((len(columns.speakers), len(FEATURES)), dtype=counts.dtype)
+		np.add.at(speaker_counts, columns.tu_speaker, counts)
+
+		warning_labels, warnings = _label_matrix([tu.warnings for tu in transcript.transcription_units], np.int64)
+		error_labels, errors = _label_matrix([tu.errors for tu in transcript.transcription_units], bool)
+
+		durations = np.array([tu.duration for tu in transcript.transcription_units], dtype=np.float64)
+		span_counts = np.array([[len(getattr(tu, kind)) for kind in SPAN_KINDS] for tu in transcript.transcription_units],
+								dtype=np.int64).reshape(n_units, len(SPAN_KINDS))
+
+		return cls(np.bincount(columns.tu_index, minlength=n_units), counts, speaker_counts,
+					warnings, errors, durations, span_counts,
+					list(columns.speakers), list(warning_labels), list(error_labels))
+
+	def per_tu(self, feature):
+		"""Number of tokens having `feature` in each transcription unit, in transcript order"""
+		return self.counts[:, FEATURE_INDEX[feature]]
+
+	def spans_per_tu(self, kind):
+		"""Number of annotated spans of `kind` (see `SPAN_KINDS`) in each transcription unit, in transcript order"""
+		return self.span_counts[:, SPAN_KINDS.index(kind)]
+
+	def per_speaker(self, feature):
+		"""Number of tokens having `feature` for each speaker"""
+		return dict(zip(self.speakers, self.speaker_counts[:, FEATURE_INDEX[feature]].tolist()))
+
+	def warnings_total(self):
+		"""Sum of the values of each warning over the transcription units"""
+		return dict(zip(self.warning_labels, self.warnings.sum(axis=0).tolist()))
+
+	def errors_total(self):
+		"""Number of transcription units with each error"""
+		return dict(zip(self.error_labels, self.errors.sum(axis=0).tolist()))
+
+
+@dataclass
+class TimeSeries:
+	statistics: List[str]
+	ends: np.ndarray
+	totals: np.ndarray
+	integer: np.ndarray
+	speaker_ends: List[np.ndarray]
+	speaker_totals: List[np.ndarray]
+	speakers: List[str] = field(default_factory=lambda: [])
+	ratios: Dict[str, Tuple[str, str]] = field(default_factory=lambda: {})
+
+	@classmethod
+	def from_values(cls, values, ends, unit_speakers, speakers, ratios=None):
+		"""
+		Builds the cumulative totals of each statistic over the units sorted by end time, for the whole
+		transcript and for each speaker.
+
+		:param values: dictionary mapping the name of each statistic to an array with the value of each unit
+		:param ends: end times of the units
+		:param unit_speakers: index in `speakers` of the speaker of each unit
+		:param speakers: names of the speakers
+		:param ratios: dictionary mapping the name of a statistic to the names of its numerator and denominator
+			(e.g., average number of tokens per unit), computed when the index is queried
+		"""
+		ratios = dict(ratios or {})
+		names = [name for name in values if name not in ratios]
+		ends = np.asarray(ends, dtype=np.float64)
+		unit_speakers = np.asarray(unit_speakers)
+
+		order = np.argsort(ends, kind="stable")
+		matrix = np.zeros((len(ends), len(names)), dtype=np.float64)
+		for column, name in enumerate(names):
+			matrix[:, column] = values[name]
+
+		def _prefix_sums(positions):
+			totals = np.zeros((len(positions)+1, len(names)), dtype=np.float64)
+			np.cumsum(matrix[positions], axis=0, out=totals[1:])
+			return ends[positions], totals
+
+		ends_sorted, totals = _prefix_sums(order)
+		speaker_ends, speaker_totals = [], []
+		for speaker_code in range(len(speakers)):
+			x, y = _prefix_sums(order[unit_speakers[order] == speaker_code])
+			speaker_ends.append(x)
+			speaker_totals.append(y)
+
+		return cls(names + list(ratios), ends_sorted, totals,
+					np.array([np.asarray(values[name]).dtype.kind != "f" for name in names], dtype=bool),
+					speaker_ends, speaker_totals, list(speakers), ratios)
+
+	def _totals_at(self, edges, speakers):
+		if speakers is None:
+			return self.totals[np.searchsorted(self.ends, edges, side="right")]
+
+		ret = np.zeros((len(edges), self.totals.shape[1]), dtype=np.float64)
+		for speaker_code, speaker in enumerate(self.speakers):
+			if speaker in speakers:
+				ret += self.speaker_totals[speaker_code][np.searchsorted(self.speaker_ends[speaker_code], edges, side="right")]
+		return ret
+
+	def _as_series(self, matrix):
+		ret = {}
+		columns = [name for name in self.statistics if name not in self.ratios]
+		for column, name in enumerate(columns):
+			series = matrix[:, column]
+			ret[name] = np.rint(series).astype(np.int64).tolist() if self.integer[column] else series.tolist()
+
+		for name, (numerator, denominator) in self.ratios.items():
+			ret[name] = [x / n if n > 0 else 0 for x, n in zip(ret[numerator], ret[denominator])]
+
+		return {name: ret[name] for name in self.statistics}
+
+	def window_edges(self, window_size, start=0, end=None):
+		"""
+		Boundaries of consecutive windows of `window_size` seconds, from `start` to `end`
+		(defaults to the end of the last unit)
+		"""
+		if end is None:
+			end = self.ends[-1] if len(self.ends) else start
+		n_windows = max(1, int(np.ceil((end - start) / window_size)))
+		return start + window_size * np.arange(n_windows+1, dtype=np.float64)
+
+	def windows(self, window_size, start=0, end=None, speakers=None, cumulative=False):
+		"""
+		The function `windows` computes each statistic over consecutive time windows: a unit belongs to the
+		window in which it ends, windows are closed on the right. Each window only needs the difference of
+		two cumulative totals.
+
+		:param window_size: duration of windows, in seconds
+		:param start: start of the first window
+		:param end: end of the last window, defaults to the end of the last unit
+		:param speakers: names of the speakers whose units are counted, defaults to all units
+		:param cumulative: whether each window also includes all the previous units
+		:return: dictionary mapping the name of each statistic to the list of its values, one per window
+		"""
+		edges = self.window_edges(window_size, start, end)
+		if start <= 0:
+			# units ending at the start of the transcript belong to the first window
+			edges[0] = -np.inf
+
+		totals = self._totals_at(edges, speakers)
+		if cumulative:
+			return self._as_series(totals[1:] - totals[0])
+		return self._as_series(np.diff(totals, axis=0))
+
+	def total(self, start=None, end=None, speakers=None):
+		"""
+		The function `total` computes each statistic over the units ending in a time range.
+
+		:param start: start of the range (excluded), defaults to the start of the transcript
+		:param end: end of the range (included), defaults to the end of the transcript
+		:param speakers: names of the speakers whose units are counted, defaults to all units
+		:return: dictionary mapping the name of each statistic to its value
+		"""
+		edges = np.array([-np.inf if start is None else start, np.inf if end is None else end], dtype=np.float64)
+		return {name: x[0] for name, x in self._as_series(np.diff(self._totals_at(edges, speakers), axis=0)).items()}
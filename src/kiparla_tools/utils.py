@@ -1,3 +1,97 @@
+import csv
+import dataclasses
+import hashlib
+import importlib.metadata
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+	TOOL_VERSION = importlib.metadata.version("kiparla-tools")
+except importlib.metadata.PackageNotFoundError:
+	TOOL_VERSION = None
+
+
+def file_digest(fname, chunk_size=2**20):
+	"""
+	The function `file_digest` computes the SHA-256 hash of the content of a file.
+
+	:param fname: path to the file
+	:param chunk_size: number of bytes read at a time
+	:return: hexadecimal digest
+	"""
+	digest = hashlib.sha256()
+	with open(fname, "rb") as fin:
+		for chunk in iter(lambda: fin.read(chunk_size), b""):
+			digest.update(chunk)
+
+	return digest.hexdigest()
+
+
+# annotators' metadata tables already read, by path: (modification time and size of the file, rows by NomeFile)
+_ANNOTATORS_METADATA = {}
+
+
+def annotators_metadata(fname, key_column="NomeFile"):
+	"""
+	The function `annotators_metadata` reads a table of annotators' metadata (e.g., data/data_description.csv)
+	and indexes its rows by transcript. Tables are read once per process and read again only when
+	the file is modified.
+
+	:param fname: path to the tab-separated file
+	:param key_column: column containing the transcript IDs
+	:return: dictionary mapping each transcript ID to its row (the last one, for repeated IDs),
+		empty if the file does not exist
+	"""
+	path = os.path.abspath(fname)
+	try:
+		stat = os.stat(path)
+		file_key = (stat.st_mtime_ns, stat.st_size)
+	except FileNotFoundError:
+		file_key = None
+
+	cached = _ANNOTATORS_METADATA.get(path)
+	if cached is not None and cached[0] == file_key:
+		return cached[1]
+
+	index = {}
+	if file_key is None:
+		logger.warning("Annotators' metadata %s not found, statistics will not include them", fname)
+	else:
+		with open(path, "r", encoding="utf-8") as fin:
+			for row in csv.DictReader(fin, delimiter="\t"):
+				index[row[key_column]] = row
+
+	_ANNOTATORS_METADATA[path] = (file_key, index)
+	return index
+
+
+def add_slots(cls):
+	"""
+	The function `add_slots` rebuilds a dataclass so that its instances store their fields in
+	`__slots__` instead of a per-instance `__dict__` (same as `dataclass(slots=True)`, only available from python 3.10).
+
+	:param cls: class already processed by `dataclass`
+	:return: the new class
+	"""
+	cls_dict = dict(cls.__dict__)
+	field_names = tuple(f.name for f in dataclasses.fields(cls))
+
+	cls_dict["__slots__"] = field_names
+	for field_name in field_names:
+		# defaults are already stored in the generated __init__
+		cls_dict.pop(field_name, None)
+	cls_dict.pop("__dict__", None)
+	cls_dict.pop("__weakref__", None)
+
+	new_cls = type(cls)(cls.__name__, cls.__bases__, cls_dict)
+	new_cls.__qualname__ = cls.__qualname__
+	return new_cls
+
+
 def compute_stats_per_minute(tus_list, split_size, f1_tu=lambda x: True, f2_tu=lambda x: 1):
 
 	ret_list = []
@@ -14,6 +108,55 @@ def compute_stats_per_minute(tus_list, split_size, f1_tu=lambda x: True, f2_tu=l
 
 	return ret_list
 
+def time_bins(ends, split_size):
+	"""
+	The function `time_bins` splits units into consecutive time bins, with the same rule as
+	`compute_stats_per_minute`: a new bin starts at the first unit ending after the end of the current bin
+	(and bins are never skipped).
+
+	:param ends: end times of the units, in transcript order
+	:param split_size: duration of bins
+	:return: positions of the units starting each bin after the first one
+	"""
+	bin_starts = []
+	for position, end in enumerate(ends):
+		if end > split_size*(len(bin_starts)+1):
+			bin_starts.append(position)
+
+	return bin_starts
+
+
+def binned_series(values, bin_starts):
+	"""
+	The function `binned_series` computes, for several statistics at once, the cumulative totals reached at
+	the end of each time bin (same as `compute_stats_per_minute`).
+	Statistics with the same type are accumulated together with a single cumulative sum over units.
+
+	:param values: dictionary mapping the name of each statistic to an array with the value of each unit
+	:param bin_starts: positions of the units starting each bin after the first one (see `time_bins`)
+	:return: dictionary mapping the name of each statistic to the list of its totals, one per bin
+	"""
+	ret = {}
+	for is_float in (False, True):
+		names = [name for name, x in values.items() if (np.asarray(x).dtype.kind == "f") == is_float]
+		if len(names) == 0:
+			continue
+
+		dtype = np.float64 if is_float else np.int64
+		matrix = np.column_stack([np.asarray(values[name], dtype=dtype) for name in names])
+		totals = np.zeros((len(matrix)+1, len(names)), dtype=dtype)
+		np.cumsum(matrix, axis=0, out=totals[1:])
+
+		ends = bin_starts + [len(matrix)]
+		for name, series in zip(names, totals[ends].T.tolist()):
+			if is_float:
+				# totals stay an integer 0 until the first unit is counted
+				series = [0 if end == 0 else x for end, x in zip(ends, series)]
+			ret[name] = series
+
+	return {name: ret[name] for name in values}
+
+
 def find_ngrams(inlist,n):
 	return zip(*list(inlist[i:] for i in range(n)))
 
@@ -1,5 +1,23 @@
 """Test functions"""
+import argparse
+import concurrent.futures
+import csv
+import json
+import logging
+import multiprocessing
+import numpy as np
+import pytest
 import kiparla_tools.process_text as pt
+import kiparla_tools.overlaps as ov
+import kiparla_tools.data as data
+import kiparla_tools.dataflags as df
+import kiparla_tools.columns as cols
+import kiparla_tools.serialize as serialize
+import kiparla_tools.main as main_tools
+import kiparla_tools.alignment as alignment
+import kiparla_tools.CLI as CLI
+import kiparla_tools.utils as utils
+import kiparla_tools.logging_utils as logging_utils
 
 def test_removespaces():
     """
@@ -35,6 +53,24 @@ def test_replace_che():
     assert pt.replace_che("finchè") == (1, "finché")
 
 
+def test_replace_pero():
+    """
+    The function `test_replace_pero` tests the `replace_pero` function.
+    """
+    assert pt.replace_pero("pero'") == (1, "però")
+    assert pt.replace_pero("pu:o' perche'") == (2, "pu:ò perché")
+    assert pt.replace_pero("ciao") == (0, "ciao")
+
+
+def test_check_numbers():
+    """
+    The function `test_check_numbers` tests the `check_numbers` function.
+    """
+    assert pt.check_numbers("ho 23 anni") == (1, "ho ventitré anni")
+    assert pt.check_numbers("nel 1999 e nel 12345") == (2, "nel millenovecentonovantanove e nel dodicimilatrecentoquarantacinque")
+    assert pt.check_numbers("ciao") == (0, "ciao")
+
+
 def test_pauses():
     """
     The function `test_pauses` tests the `remove_pauses` function.
@@ -105,3 +141,551 @@ def test_overlap_prolongations():
     """
     assert pt.overlap_prolongations("questo:[::") == (1, "quest[o:::")
     assert pt.overlap_prolongations("quest[o::") == (0, "quest[o::")
+
+
+def test_maximal_cliques():
+    """
+    The function `test_maximal_cliques` tests the `maximal_cliques` function.
+    """
+    intervals = [(0, 0, 4), (1, 1, 3), (2, 2, 6), (3, 4, 5), (4, 6, 7)]
+    adjacency = {0: {1, 2}, 1: {0, 2}, 2: {0, 1, 3}, 3: {2}, 4: set()}
+    assert ov.maximal_cliques(intervals, adjacency) == [[0, 1, 2], [2, 3]]
+
+    # edge 0-1 has been pruned
+    adjacency = {0: {2}, 1: {2}, 2: {0, 1, 3}, 3: {2}, 4: set()}
+    assert sorted(ov.maximal_cliques(intervals, adjacency)) == [[0, 2], [1, 2], [2, 3]]
+
+
+def test_find_overlaps():
+    """
+    The function `test_find_overlaps` tests the `find_overlaps` function on nested, touching and chained units.
+    """
+    transcript = data.Transcript("test")
+    for tu_id, speaker, start, end in [(1, "A", 0.0, 4.0),   # contains 2, touches 3
+                                       (2, "B", 1.0, 2.5),
+                                       (3, "C", 4.0, 5.0),   # 3-4-5 is a chain, 3 and 5 do not overlap
+                                       (4, "B", 4.5, 6.0),
+                                       (5, "A", 5.5, 7.0)]:
+        transcript.add(data.TranscriptionUnit(tu_id, speaker, start, end, end - start, "ciao"))
+    transcript.sort()
+    transcript.find_overlaps()
+
+    edges = {(u, v) if u < v else (v, u): (d["start"], d["end"], d["duration"])
+             for u, v, d in transcript.time_based_overlaps.edges(data=True)}
+    assert edges == {(1, 2): (1.0, 2.5, 1.5),
+                     (3, 4): (4.5, 5.0, 0.5),
+                     (4, 5): (5.5, 6.0, 0.5)}
+    assert sorted(transcript.time_based_overlaps.nodes()) == [1, 2, 3, 4, 5]
+
+
+def test_analyse_token():
+    """
+    The function `test_analyse_token` tests the `analyse_token` function.
+    """
+    analysis = data.analyse_token("cia:o::.")
+    assert analysis.text == "ciao"
+    assert analysis.intonation_pattern == df.intonation.falling
+    assert analysis.prolongations == ((2, 1), (3, 2))
+
+    analysis = data.analyse_token("po'::,")
+    assert analysis.text == "po'"
+    assert analysis.truncation is False
+    assert analysis.prolongations == ((1, 2),)
+
+    assert data.analyse_token("-CIAO").interruption is True
+    assert data.analyse_token("-CIAO").volume == df.volume.high
+    assert data.analyse_token("sant'").truncation is True
+    assert data.analyse_token("{P}").token_type == df.tokentype.shortpause
+    assert data.analyse_token("{ride}").token_type == df.tokentype.nonverbalbehavior
+    assert data.analyse_token("ci:ao1").token_type == df.tokentype.error
+
+
+def test_token_set_feature():
+    """
+    The function `test_token_set_feature` tests that features set on a new token are only added to its own maps.
+    """
+    token = data.Token("ciao", "1-1")
+    other = data.Token("ciao", "1-2")
+    assert token.warnings is data.EMPTY_FEATURES and token.overlaps is data.EMPTY_FEATURES
+
+    token.set_feature("warnings", "MOVED_BOUNDARIES", 1)
+    token.warnings["MOVED_BOUNDARIES"] += 1
+    token.warnings["ACCENTS"] += 1
+    token.add_info("overlaps", (3, "1-1", "1-2"))
+    assert token.warnings == {"MOVED_BOUNDARIES": 2, "ACCENTS": 1}
+    assert token.overlaps == {3: ("1-1", "1-2")}
+
+    assert other.warnings is data.EMPTY_FEATURES and other.overlaps is data.EMPTY_FEATURES
+    with pytest.raises(TypeError):
+        other.warnings["ACCENTS"] = 1
+
+
+def test_scan_tokens():
+    """
+    The function `test_scan_tokens` tests the `scan_tokens` function.
+    """
+    assert pt.scan_tokens("l'amico=ciao") == [(0, 2, df.spantype.elision),
+                                             (2, 7, df.spantype.word),
+                                             (7, 8, df.spantype.prosodiclink),
+                                             (8, 12, df.spantype.word)]
+    assert pt.scan_tokens("po' no") == [(0, 3, df.spantype.word),
+                                        (3, 4, df.spantype.space),
+                                        (4, 6, df.spantype.word)]
+
+
+def test_summary_writer(tmp_path):
+    """
+    The function `test_summary_writer` tests that summaries written out of order by `SummaryWriter`
+    are read back in order by `read_summaries`.
+    """
+    summaries = [{"transcript": "a", "n": 1}, {"transcript": "b\nc", "n": [1, 2]}, {"transcript": "d"}]
+    with serialize.SummaryWriter(tmp_path / "summary.json") as writer:
+        writer.write(summaries[2], position=2)
+        writer.write(None, position=1)
+        writer.write(summaries[0], position=0)
+
+    assert (tmp_path / "summary.json").read_text(encoding="utf-8") == \
+        json.dumps([summaries[0], summaries[2]], indent=2, ensure_ascii=False) + "\n"
+    assert list(serialize.read_summaries(tmp_path / "summary.json", chunk_size=5)) == [summaries[0], summaries[2]]
+
+
+def test_manifest(tmp_path):
+    """
+    The function `test_manifest` tests that the fingerprints stored in the build manifest change with the inputs.
+    """
+    csv_fname = tmp_path / "transcript.csv"
+    csv_fname.write_text("tu_id\tspeaker\tstart\tend\tduration\ttext\n", encoding="utf-8")
+
+    fingerprint = main_tools.input_fingerprint(csv_fname, None, 0.1)
+    serialize.dump_manifest({"transcript": fingerprint}, tmp_path / "manifest.json")
+    manifest = serialize.load_manifest(tmp_path / "manifest.json")
+
+    assert manifest["transcript"] == main_tools.input_fingerprint(csv_fname, None, 0.1)
+    assert manifest["transcript"] != main_tools.input_fingerprint(csv_fname, None, 0.2)
+    csv_fname.write_text("tu_id\tspeaker\tstart\tend\tduration\ttext\n1\tA\t0\t1\t1\tciao\n", encoding="utf-8")
+    assert manifest["transcript"] != main_tools.input_fingerprint(csv_fname, None, 0.1)
+    assert serialize.load_manifest(tmp_path / "missing.json") == {}
+
+
+def test_process_skips_malformed(tmp_path, caplog):
+    """
+    The function `test_process_skips_malformed` tests that `process` reports and skips a transcript
+    that cannot be processed, and goes on with the others.
+    """
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    header = "tu_id\tspeaker\tstart\tend\tduration\ttext\n"
+    (input_dir / "good.csv").write_text(header + "1\tA\t0\t1.2\t1.2\tciao come va?\n", encoding="utf-8")
+    (input_dir / "bad.csv").write_text(header + "1\tA\tzero\t1.2\t1.2\tciao come va?\n", encoding="utf-8")
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+
+    args = argparse.Namespace(input_dir=None, input_files=[input_dir / "bad.csv", input_dir / "good.csv"],
+                              units_annotations_dir=None, output_dir=output_dir, duration_threshold=0.1,
+                              force=False, save_transcripts=False, produce_stats=True, stats_parquet=False, jobs=1)
+    CLI._process(args)
+
+    assert "Error while processing bad" in caplog.text
+    assert [summary["transcript"] for summary in serialize.read_summaries(output_dir / "summary.json")] == ["good"]
+    assert list(serialize.load_manifest(output_dir / serialize.MANIFEST_FNAME)) == ["good"]
+    with open(output_dir / "stats.csv", encoding="utf-8") as fin:
+        assert len(list(csv.DictReader(fin, delimiter="\t"))) == 1
+
+
+def test_transcription_unit_labels():
+    """
+    The function `test_transcription_unit_labels` tests the normalized annotation and the warning, error and
+    switch labels of sample transcription units.
+    """
+    samples = [("ciao  come va", "ciao come va", {"MULTIPLE_SPACES": 1}, []),
+               ("perchè no", "perché no", {"ACCENTS": 1}, []),
+               ("{P} ciao {P}", "ciao", {"TRIM_PAUSES": 2}, []),
+               ("ciao ( bene )", "ciao (bene)", {"UNEVEN_SPACES": 2}, []),
+               ("(ride) e <lento >", "(ride) e <lento>", {"UNEVEN_SPACES": 1}, []),
+               ("ciao =bene", "ciao=bene", {"UNEVEN_SPACES": 1}, []),
+               ("ciao ((ride))", "ciao {ride}", {"META_TAGS": 2}, []),
+               ("ciao.: bene", "ciao:. bene", {"SWITCHES": 1}, []),
+               ("°ciao come va", "°ciao come va", {}, ["UNBALANCED_DOTS"]),
+               ("[ciao come", "[ciao come", {}, ["UNBALANCED_OVERLAP"]),
+               ("<ciao", "<ciao", {}, ["UNBALANCED_PACE"]),
+               ("(ciao bene", "(ciao bene", {}, ["UNBALANCED_GUESS"]),
+               ("sì.. no", "sì.. no", {}, [])]
+
+    for annotation, normalized, warnings, errors in samples:
+        tu = data.TranscriptionUnit(1, "A", 0.0, 1.0, 1.0, annotation)
+        assert tu.annotation == normalized
+        assert tu.include
+        assert {label: value for label, value in tu.warnings.items() if value} == warnings
+        assert sorted(label for label, value in tu.errors.items() if value) == errors
+
+    tu = data.TranscriptionUnit(1, "A", 0.0, 1.0, 1.0, "# ciao")
+    assert tu.non_ita == df.languagevariation.some and tu.annotation == "ciao"
+    assert not data.TranscriptionUnit(1, "A", 0.0, 1.0, 1.0, "[ ]").include
+
+
+def test_token_feature_spans():
+    """
+    The function `test_token_feature_spans` tests that feature spans are resolved on the characters of the tokens
+    when tokens contain several runs of characters separated by transcription symbols.
+    """
+    tu = data.TranscriptionUnit(1, "A", 0.0, 1.0, 1.0, "<a:nche pe>rò")
+    tu.tokenize()
+    runs, run_ends = tu._char_runs()
+    assert runs == [(1, 2, 0, 0), (3, 7, 0, 1), (8, 10, 1, 0), (11, 13, 1, 2)]
+    assert run_ends == [2, 7, 10, 13]
+
+    def features(annotation):
+        tu = data.TranscriptionUnit(1, "A", 0.0, 1.0, 1.0, annotation)
+        tu.tokenize()
+        tu.add_token_features()
+        return [(tok.text, dict(tok.slow_pace), dict(tok.fast_pace), dict(tok.low_volume), dict(tok.guesses))
+                for tok in tu.tokens.values()]
+
+    assert features("<a:nche pe>rò >co:sì< ciao") == [("anche", {0: (0, 5)}, {}, {}, {}),
+                                                       ("però", {0: (0, 2)}, {}, {}, {}),
+                                                       ("così", {}, {0: (0, 4)}, {}, {}),
+                                                       ("ciao", {}, {}, {}, {})]
+    assert features("tu (for:se: no) sì") == [("tu", {}, {}, {}, {}),
+                                               ("forse", {}, {}, {}, {0: (0, 5)}),
+                                               ("no", {}, {}, {}, {0: (0, 2)}),
+                                               ("sì", {}, {}, {}, {})]
+    assert features("dopo °ve°ro") == [("dopo", {}, {}, {}, {}),
+                                        ("vero", {}, {}, {0: (0, 2)}, {})]
+
+
+def test_units_queries():
+    """
+    The function `test_units_queries` tests `units_between`, `units_at` and `units_before`,
+    including units starting or ending exactly at the queried times.
+    """
+    transcript = data.Transcript("test")
+    for tu_id, speaker, start, end in [(3, "A", 1.0, 3.0), (1, "A", 0.0, 1.0), (4, "B", 3.0, 3.5), (2, "B", 0.5, 2.0)]:
+        transcript.add(data.TranscriptionUnit(tu_id, speaker, start, end, end - start, "ciao"))
+    transcript.sort()
+
+    def ids(units):
+        return [tu.tu_id for tu in units]
+
+    assert ids(transcript.units_between(1.0, 3.0)) == [2, 3]
+    assert ids(transcript.units_between(0.0, 3.0, speaker="A")) == [1, 3]
+    assert ids(transcript.units_between(0.2, 0.4)) == [1]
+    assert ids(transcript.units_between(3.5, 4.0)) == []
+    assert ids(transcript.units_between(0.0, 4.0, speaker="C")) == []
+
+    assert ids(transcript.units_at(0.0)) == [1]
+    assert ids(transcript.units_at(1.0)) == [2, 3]
+    assert ids(transcript.units_at(3.0, speaker="B")) == [4]
+    assert ids(transcript.units_at(3.5)) == []
+
+    assert ids(transcript.units_before(0.99)) == []
+    assert ids(transcript.units_before(1.0)) == [1]
+    assert ids(transcript.units_before(3.0, speaker="B")) == [2]
+    assert ids(transcript.units_before(3.5)) == [1, 2, 3, 4]
+
+
+def _processed_transcript(units):
+    transcript = data.Transcript("test")
+    for tu_id, speaker, start, end, annotation in units:
+        transcript.add(data.TranscriptionUnit(tu_id, speaker, start, end, end - start, annotation))
+    transcript.sort()
+    transcript.find_overlaps()
+    for tu in transcript:
+        tu.tokenize()
+    transcript.check_overlaps(0.1, [])
+    for tu in transcript:
+        tu.add_token_features()
+    return transcript
+
+
+def test_token_columns():
+    """
+    The function `test_token_columns` tests the values and the flag bits of `TokenColumns`.
+    """
+    transcript = _processed_transcript([(1, "A", 0.0, 1.0, "ciao:: come va?"),
+                                        (2, "B", 0.5, 2.0, "[sì] CASA"),
+                                        (3, "A", 2.0, 3.0, "<veloce> {P} cia-")])
+    columns = transcript.build_token_columns()
+
+    assert len(columns) == 8
+    assert columns.forms == ["ciao", "come", "va", "sì", "casa", "veloce", "{P}", "cia-"]
+    assert columns.speakers == ["A", "B"]
+    assert columns.tu_index.tolist() == [0, 0, 0, 1, 1, 2, 2, 2]
+    assert columns.speaker.tolist() == [0, 0, 0, 1, 1, 0, 0, 0]
+    assert columns.tu_start.tolist() == [0.0, 0.5, 2.0]
+    assert columns.tu_end.tolist() == [1.0, 2.0, 3.0]
+    assert columns.tu_speaker.tolist() == [0, 1, 0]
+
+    assert columns.has_type(df.tokentype.shortpause).tolist() == [False] * 6 + [True, False]
+    assert columns.has_intonation(df.intonation.rising).tolist() == [False, False, True] + [False] * 5
+    assert columns.has_volume(df.volume.high).tolist() == [False] * 4 + [True] + [False] * 3
+    assert columns.flags.tolist() == [cols.SPACEAFTER | cols.PROLONGED, cols.SPACEAFTER, cols.SPACEAFTER,
+                                      cols.SPACEAFTER | cols.OVERLAPPING, cols.SPACEAFTER,
+                                      cols.SPACEAFTER | cols.SLOW_PACE, cols.SPACEAFTER,
+                                      cols.SPACEAFTER | cols.INTERRUPTION]
+
+    assert columns.count_per_tu(columns.has_type(df.tokentype.linguistic)).tolist() == [3, 2, 2]
+    assert columns.count_per_speaker(columns.has_flag(cols.SLOW_PACE | cols.OVERLAPPING)).tolist() == [1, 1]
+
+
+def test_transcript_cache(tmp_path):
+    """
+    The function `test_transcript_cache` tests that a transcript saved by `save_transcript` is restored
+    by `load_transcript`, and that outdated files are ignored.
+    """
+    transcript = data.Transcript("test")
+    transcript.add(data.TranscriptionUnit(1, "A", 0.0, 1.2, 1.2, "ciao come va?"))
+    transcript.add(data.TranscriptionUnit(2, "B", 1.0, 2.0, 1.0, "[bene] grazie"))
+    transcript.sort()
+    for tu in transcript:
+        tu.tokenize()
+
+    serialize.save_transcript(transcript, tmp_path / "test.transcript.cache")
+    restored = serialize.load_transcript(tmp_path / "test.transcript.cache")
+
+    assert serialize.transcript_cache_is_current(tmp_path / "test.transcript.cache")
+    assert [tu.annotation for tu in restored] == [tu.annotation for tu in transcript]
+    assert [[tok.text for tok in tu.tokens.values()] for tu in restored] == \
+        [[tok.text for tok in tu.tokens.values()] for tu in transcript]
+
+    content = (tmp_path / "test.transcript.cache").read_bytes()
+    (tmp_path / "test.transcript.cache").write_bytes(content.replace(b'"version": ', b'"version": 0', 1))
+    assert not serialize.transcript_cache_is_current(tmp_path / "test.transcript.cache")
+    assert serialize.load_transcript(tmp_path / "test.transcript.cache") is None
+
+
+def test_align_transcripts_dir(tmp_path):
+    """
+    The function `test_align_transcripts_dir` tests that `align` gives the same result with transcripts
+    restored from `--transcripts-dir` and with transcripts processed from the CSV files,
+    and that saved transcripts are only restored when they were processed from the same inputs.
+    """
+    header = "tu_id\tspeaker\tstart\tend\tduration\ttext\n"
+    csv_a = tmp_path / "01_test.csv"
+    csv_a.write_text(header + "1\tA\t0\t1.2\t1.2\tciao come va?\n"
+                     "2\tB\t1.15\t2\t0.85\t[bene] grazie\n"
+                     "3\tTraduzione\t0\t2\t2\thello how are you\n", encoding="utf-8")
+    csv_b = tmp_path / "02_test.csv"
+    csv_b.write_text(header + "1\tA\t0\t1.1\t1.1\tciao come stai\n"
+                     "2\tB\t1.0\t2.5\t1.5\t[bene] grazie mille\n", encoding="utf-8")
+
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    for csv_fname in (csv_a, csv_b):
+        main_tools.process_and_write(csv_fname, {}, output_dir, save_transcript=True,
+                                     fingerprint=main_tools.input_fingerprint(csv_fname, None))
+        assert serialize.load_transcript(output_dir / f"{csv_fname.stem}{serialize.TRANSCRIPT_CACHE_SUFFIX}",
+                                         main_tools.input_fingerprint(csv_fname, None)) is not None
+
+    def aligned(transcripts_dir):
+        tokens_a, tokens_b = alignment.align_transcripts(main_tools.load_or_process_transcript(csv_a, transcripts_dir),
+                                                         main_tools.load_or_process_transcript(csv_b, transcripts_dir))
+        return [(token_a.text if token_a else None, token_b.text if token_b else None)
+                for token_a, token_b in zip(tokens_a, tokens_b)]
+
+    assert aligned(output_dir) == aligned(None)
+
+    csv_b.write_text(header + "1\tA\t0\t1.1\t1.1\tciao\n", encoding="utf-8")
+    assert serialize.load_transcript(output_dir / f"02_test{serialize.TRANSCRIPT_CACHE_SUFFIX}",
+                                     main_tools.input_fingerprint(csv_b, None)) is None
+    assert [tok.text for tu in main_tools.load_or_process_transcript(csv_b, output_dir)
+            for tok in tu.tokens.values()] == ["ciao"]
+    assert aligned(output_dir) == aligned(None)
+
+
+def test_jefferson_feats():
+    """
+    The function `test_jefferson_feats` tests the `jefferson_feats` column of the CoNLL output.
+    """
+    assert serialize.jefferson_feats(df.intonation.plain, False, False, False, True,
+                                     False, "ita", False, None) == "_"
+    assert serialize.jefferson_feats(df.intonation.rising, True, False, False, False,
+                                     True, "eng", False, df.volume.low) == \
+        "Intonation=rising|Interrupted=Yes|SpaceAfter=No|Language=eng|Volume=low"
+
+
+def test_transcript_summary():
+    """
+    The function `test_transcript_summary` tests the counts of `TranscriptSummary`.
+    """
+    transcript = data.Transcript("test")
+    transcript.add(data.TranscriptionUnit(1, "A", 0.0, 1.0, 1.0, "ciao (.) come va?"))
+    transcript.add(data.TranscriptionUnit(2, "B", 2.0, 3.0, 1.0, "bene xxx grazie."))
+    transcript.add(data.TranscriptionUnit(3, "A", 4.0, 5.0, 1.0, "°piano°"))
+    transcript.sort()
+    for tu in transcript:
+        tu.tokenize()
+        tu.add_token_features()
+
+    summary = transcript.get_summary()
+    assert summary.tokens.tolist() == [4, 3, 1]
+    assert summary.per_tu(df.tokentype.linguistic).tolist() == [3, 2, 1]
+    assert summary.per_tu(df.tokentype.shortpause).tolist() == [1, 0, 0]
+    assert summary.per_tu(df.tokentype.unknown).tolist() == [0, 1, 0]
+    assert summary.per_tu(df.intonation.rising).tolist() == [1, 0, 0]
+    assert summary.per_speaker(df.tokentype.linguistic) == {"A": 4, "B": 2}
+    assert summary.per_speaker(df.volume.low) == {"A": 1, "B": 0}
+    assert summary.errors_total()["UNBALANCED_DOTS"] == 0
+
+
+def test_binned_series():
+    """
+    The function `test_binned_series` tests that `binned_series` gives the same totals as `compute_stats_per_minute`.
+    """
+    transcript = data.Transcript("test")
+    for tu_id, end in enumerate([10.0, 50.0, 70.0, 200.0, 210.0, 250.0]):
+        transcript.add(data.TranscriptionUnit(tu_id, "A", end - 5, end, 5.0, "ciao"))
+    transcript.sort()
+
+    bin_starts = utils.time_bins([tu.end for tu in transcript], 60)
+    assert bin_starts == [2, 3, 4, 5]
+
+    series = utils.binned_series({"num_tu": np.ones(6, dtype=np.int64),
+                                  "duration": np.full(6, 5.0)}, bin_starts)
+    assert series["num_tu"] == utils.compute_stats_per_minute(transcript, 60)
+    assert series["duration"] == utils.compute_stats_per_minute(transcript, 60, f2_tu=lambda x: x.duration)
+
+
+def test_time_series():
+    """
+    The function `test_time_series` tests statistics over time windows and speakers computed by `TimeSeries`.
+    """
+    transcript = data.Transcript("test")
+    for tu_id, (speaker, end) in enumerate([("A", 10.0), ("B", 30.0), ("A", 50.0), ("B", 70.0), ("A", 130.0)]):
+        transcript.add(data.TranscriptionUnit(tu_id, speaker, end - 5, end, 5.0, "ciao come va"))
+    transcript.sort()
+    for tu in transcript:
+        tu.tokenize()
+        tu.add_token_features()
+
+    time_series = transcript.get_time_series()
+    assert time_series.windows(60)["num_tu"] == [3, 1, 1]
+    assert time_series.windows(30)["tokens_per_minute"] == [6, 3, 3, 0, 3]
+    assert time_series.windows(60, cumulative=True)["num_tu"] == [3, 4, 5]
+    assert time_series.windows(60, speakers=["A"])["num_tu"] == [2, 0, 1]
+    assert time_series.windows(60)["avg_tokens_per_min"] == [3.0, 3.0, 3.0]
+    assert time_series.total(30, 130, speakers=["B"])["num_tu"] == 1
+
+
+def test_annotators_metadata(tmp_path):
+    """
+    The function `test_annotators_metadata` tests that annotators' metadata are indexed and read again when modified.
+    """
+    fname = tmp_path / "data_description.csv"
+    fname.write_text("NomeFile\tEsperto\nA\tsì\nB\tno\n", encoding="utf-8")
+    assert utils.annotators_metadata(fname)["B"] == {"NomeFile": "B", "Esperto": "no"}
+    assert utils.annotators_metadata(fname) is utils.annotators_metadata(fname)
+
+    fname.write_text("NomeFile\tEsperto\nA\tsì\nB\tsì\nC\tno\n", encoding="utf-8")
+    assert utils.annotators_metadata(fname)["B"]["Esperto"] == "sì"
+    assert utils.annotators_metadata(tmp_path / "missing.csv") == {}
+
+
+def test_corpus_statistics(tmp_path):
+    """
+    The function `test_corpus_statistics` tests the table written by `CorpusStatistics`, with rows added out of order.
+    """
+    corpus_statistics = serialize.CorpusStatistics(capacity=1, n_bins=1)
+    corpus_statistics.append({"num_speakers": 2, "num_tu": [1, 3, 4], "avg": [0, 2.5, 3.0]}, position=2)
+    corpus_statistics.append({"num_speakers": 1, "num_tu": [5], "avg": [0], "Tipo": "Revised"}, position=0)
+
+    corpus_statistics.write_tsv(tmp_path / "stats.csv")
+    assert (tmp_path / "stats.csv").read_text(encoding="utf-8").splitlines() == [
+        "num_speakers\tTipo\tnum_tu::0\tnum_tu::1\tnum_tu::2\tavg::0\tavg::1\tavg::2",
+        "1\tRevised\t5\t0\t0\t0\t0.0\t0.0",
+        "2\t\t1\t3\t4\t0\t2.5\t3.0"]
+    assert corpus_statistics.to_dataframe().shape == (2, 8)
+
+
+def test_read_eaf(tmp_path):
+    """
+    The function `test_read_eaf` tests the times of alignable and reference annotations read by `read_eaf`.
+    """
+    (tmp_path / "test.eaf").write_text(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<ANNOTATION_DOCUMENT FORMAT="3.0" VERSION="3.0"><TIME_ORDER>'
+        '<TIME_SLOT TIME_SLOT_ID="ts1" TIME_VALUE="1500"/><TIME_SLOT TIME_SLOT_ID="ts2" TIME_VALUE="2250"/>'
+        '<TIME_SLOT TIME_SLOT_ID="ts3" TIME_VALUE="500"/><TIME_SLOT TIME_SLOT_ID="ts4"/></TIME_ORDER>'
+        '<TIER TIER_ID="Note"><ANNOTATION><REF_ANNOTATION ANNOTATION_ID="a3" ANNOTATION_REF="a1">'
+        '<ANNOTATION_VALUE>nota</ANNOTATION_VALUE></REF_ANNOTATION></ANNOTATION></TIER>'
+        '<TIER TIER_ID="A"><ANNOTATION><ALIGNABLE_ANNOTATION ANNOTATION_ID="a1" TIME_SLOT_REF1="ts1" TIME_SLOT_REF2="ts2">'
+        '<ANNOTATION_VALUE>id:4 ciao</ANNOTATION_VALUE></ALIGNABLE_ANNOTATION></ANNOTATION></TIER>'
+        '<TIER TIER_ID="B"><ANNOTATION><ALIGNABLE_ANNOTATION ANNOTATION_ID="a2" TIME_SLOT_REF1="ts3" TIME_SLOT_REF2="ts1">'
+        '<ANNOTATION_VALUE>come va</ANNOTATION_VALUE></ALIGNABLE_ANNOTATION></ANNOTATION>'
+        '<ANNOTATION><ALIGNABLE_ANNOTATION ANNOTATION_ID="a4" TIME_SLOT_REF1="ts2" TIME_SLOT_REF2="ts4">'
+        '<ANNOTATION_VALUE>bene</ANNOTATION_VALUE></ALIGNABLE_ANNOTATION></ANNOTATION></TIER>'
+        '</ANNOTATION_DOCUMENT>', encoding="utf-8")
+
+    assert list(serialize.read_eaf(tmp_path / "test.eaf")) == [("Note", 1500, 2250, "nota"),
+                                                              ("A", 1500, 2250, "id:4 ciao"),
+                                                              ("B", 500, 1500, "come va"),
+                                                              ("B", 2250, None, "bene")]
+
+    annotations = {"ignore": ["4"]}
+    serialize.eaf2csv(tmp_path / "test.eaf", tmp_path / "test.csv", annotations)
+    assert (tmp_path / "test.csv").read_text(encoding="utf-8").splitlines() == [
+        "tu_id\tspeaker\tstart\tend\tduration\ttext",
+        "0\tB\t0.500\t1.500\t1.000\tcome va",
+        "1\tNote\t1.500\t2.250\t0.750\tnota",
+        "2\tA\t1.500\t2.250\t0.750\tciao",
+        "3\tB\t2.250\t\t\tbene"]
+
+
+def test_overlap_duration(tmp_path):
+    """
+    The function `test_overlap_duration` tests the `E:overlap_duration` column of the linear output,
+    where overlapping units are listed in increasing order.
+    """
+    transcript = data.Transcript("test")
+    transcript.add(data.TranscriptionUnit(9, "A", 0.0, 4.0, 4.0, "ciao come va"))
+    transcript.add(data.TranscriptionUnit(5, "B", 1.0, 5.0, 4.0, "bene grazie"))
+    transcript.add(data.TranscriptionUnit(2, "C", 2.0, 6.0, 4.0, "anche io"))
+    transcript.add(data.TranscriptionUnit(7, "D", 5.5, 8.0, 2.5, "ok"))
+    transcript.sort()
+    transcript.find_overlaps(duration_threshold=0.1)
+    for tu in transcript:
+        tu.tokenize()
+    transcript.check_overlaps(0.1, [])
+    for tu in transcript:
+        tu.add_token_features()
+
+    serialize.conversation_to_linear(transcript, tmp_path / "test.csv")
+    with open(tmp_path / "test.csv", encoding="utf-8") as fin:
+        rows = {row["tu_id"]: row["E:overlap_duration"] for row in csv.DictReader(fin, delimiter="\t")}
+    assert rows == {"9": "2+5=2.000", "5": "2+9=2.000", "2": "7=0.500,5+9=2.000", "7": "2=0.500"}
+
+
+def _log_from_worker(message):
+    logger = logging.getLogger(f"{logging_utils.PACKAGE_LOGGER}.test")
+    logger.info("%s info", message)
+    logger.error("%s error", message)
+
+
+def test_logging_setup(tmp_path, monkeypatch):
+    """
+    The function `test_logging_setup` tests that `setup_logging` only configures the package logger once,
+    and that records logged by worker processes reach the listener of the main process.
+    """
+    monkeypatch.setenv("LOG_FILE", str(tmp_path / "test.log"))
+    monkeypatch.setenv("ERROR_FILE", str(tmp_path / "errors.log"))
+    monkeypatch.setenv("LOG_LEVEL", "INFO")
+    package_logger = logging.getLogger(logging_utils.PACKAGE_LOGGER)
+    level, handlers = package_logger.level, list(package_logger.handlers)
+
+    logging_utils.stop_logging()
+    try:
+        log_queue = logging_utils.setup_logging(multiprocessing.Queue())
+        assert logging_utils.setup_logging() is log_queue
+        assert len(package_logger.handlers) == len(handlers) + 1
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1, initializer=logging_utils.setup_worker_logging,
+                                                    initargs=(log_queue, logging.INFO)) as executor:
+            executor.submit(_log_from_worker, "worker").result()
+    finally:
+        logging_utils.stop_logging()
+        package_logger.setLevel(level)
+
+    assert package_logger.handlers == handlers
+    log = (tmp_path / "test.log").read_text(encoding="utf-8")
+    assert "worker info" in log and "worker error" in log
+    errors = (tmp_path / "errors.log").read_text(encoding="utf-8")
+    assert "worker info" not in errors and "worker error" in errors